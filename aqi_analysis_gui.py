@@ -5,11 +5,13 @@ from PyQt5.QtCore import Qt
 import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-from scipy.interpolate import lagrange, CubicSpline
+import aqi_fitting
+import aqi_interpolation
+import fast_plots
 
 class AQIAnalysisGUI(QWidget):
     
-    def __init__(self):
+    def __init__(self, decimate=None):
         #initialize GUI
         super().__init__()
         
@@ -23,6 +25,11 @@ class AQIAnalysisGUI(QWidget):
         #interpolation target
         self.x_new = 2.5
         
+        #draw at screen resolution once the series are long (None = decide from the data size)
+        if decimate is None:
+            decimate = len(self.days_full) >= fast_plots.FAST_PLOT_MIN_POINTS
+        self.decimate = decimate
+        
         self.setup_gui()
         self.analyze_and_display()
         
@@ -52,43 +59,27 @@ class AQIAnalysisGUI(QWidget):
 
     def lagrange_interpolation(self, x, y, x_new):
         #Lagrange interpolation
-        poly = lagrange(x, y)
-        return poly(x_new)
+        return aqi_interpolation.lagrange_interpolation(x, y, x_new)
 
     def newton_divided_diff(self, x, y):
         #compute divided difference coefficients.
-        n = len(x)
-        coef = np.copy(y).astype(float)
-        for j in range(1, n):
-            coef[j:n] = (coef[j:n] - coef[j - 1:n - 1]) / (x[j:n] - x[0:n - j])
-        return coef
+        return aqi_interpolation.newton_divided_diff(x, y)
 
     def newton_interpolation(self, x, coef, x_new):
         #Newton interpolation
-        n = len(coef)
-        result = coef[0]
-        product = 1.0
-        for i in range(1, n):
-            product *= (x_new - x[i - 1])
-            result += coef[i] * product
-        return result
+        return aqi_interpolation.newton_interpolation(x, coef, x_new)
 
     def neville_interpolation(self, x, y, x_new):
         #Neville interpolation
-        n = len(x)
-        Q = np.zeros((n, n))
-        Q[:, 0] = y
-        for j in range(1, n):
-            for i in range(n - j):
-                Q[i][j] = ((x_new - x[i + j]) * Q[i][j - 1] -
-                          (x_new - x[i]) * Q[i + 1][j - 1]) / (x[i] - x[i + j])
-        return Q[0, n - 1]
+        return aqi_interpolation.neville_interpolation(x, y, x_new)
+
+    def barycentric_interpolation(self, x, y, x_new, weights=None):
+        #barycentric interpolation, vectorized over x_new
+        return aqi_interpolation.barycentric_interpolation(x, y, x_new, weights)
 
     def least_squares_fit(self, x, y, degree=2):
         #polynomial using least squares
-        coeffs = np.polyfit(x, y, degree)
-        poly = np.poly1d(coeffs)
-        return poly
+        return aqi_interpolation.least_squares_fit(x, y, degree)
         
     def analyze_and_display(self):
         #calculate results for subset data 
@@ -99,6 +90,8 @@ class AQIAnalysisGUI(QWidget):
         
         neville_subset = self.neville_interpolation(self.days_subset, self.aqi_subset, self.x_new)
         
+        barycentric_subset = self.barycentric_interpolation(self.days_subset, self.aqi_subset, self.x_new)
+        
         #calculate results for full dataset 
         lagrange_full = self.lagrange_interpolation(self.days_full, self.aqi_full, self.x_new)
         
@@ -107,9 +100,11 @@ class AQIAnalysisGUI(QWidget):
         
         neville_full = self.neville_interpolation(self.days_full, self.aqi_full, self.x_new)
         
+        barycentric_full = self.barycentric_interpolation(self.days_full, self.aqi_full, self.x_new)
+        
         #display results in the results tab
-        self.display_results(lagrange_subset, newton_subset, neville_subset, 
-                             lagrange_full, newton_full, neville_full)
+        self.display_results(lagrange_subset, newton_subset, neville_subset, barycentric_subset,
+                             lagrange_full, newton_full, neville_full, barycentric_full)
         
         #create plots for visualization
         self.create_plots()
@@ -117,8 +112,8 @@ class AQIAnalysisGUI(QWidget):
         #display data used
         self.display_data()
         
-    def display_results(self, lagrange_subset, newton_subset, neville_subset, 
-                         lagrange_full, newton_full, neville_full):
+    def display_results(self, lagrange_subset, newton_subset, neville_subset, barycentric_subset,
+                         lagrange_full, newton_full, neville_full, barycentric_full):
         #add title
         title = QLabel("Interpolation Results")
         title.setStyleSheet("font-size: 18px; font-weight: bold;")
@@ -149,6 +144,9 @@ class AQIAnalysisGUI(QWidget):
         neville_item = QTreeWidgetItem(["Neville", f"{neville_subset:.2f}"])
         subset_tree.addTopLevelItem(neville_item)
         
+        barycentric_item = QTreeWidgetItem(["Barycentric", f"{barycentric_subset:.2f}"])
+        subset_tree.addTopLevelItem(barycentric_item)
+        
         subset_layout.addWidget(subset_tree)
         
         #create the table for full 5-point dataset
@@ -170,12 +168,15 @@ class AQIAnalysisGUI(QWidget):
         neville_item = QTreeWidgetItem(["Neville", f"{neville_full:.2f}"])
         full_tree.addTopLevelItem(neville_item)
         
+        barycentric_item = QTreeWidgetItem(["Barycentric", f"{barycentric_full:.2f}"])
+        full_tree.addTopLevelItem(barycentric_item)
+        
         full_layout.addWidget(full_tree)
         
         #add explanation text
         explanation = (
             "Comparison of different interpolation methods to estimate the Air Quality Index at Day 2.5.\n"
-            "All three methods should produce the same results when using the same dataset, as they are "
+            "All four methods should produce the same results when using the same dataset, as they are "
             "mathematically equivalent for polynomial interpolation."
         )
         
@@ -184,29 +185,36 @@ class AQIAnalysisGUI(QWidget):
         explanation_label.setAlignment(Qt.AlignCenter)
         self.results_layout.addWidget(explanation_label)
     
+    def plot_points(self, ax, x, y, *args, **kwargs):
+        #raw samples; long series are drawn as their per-pixel min/max envelope
+        if self.decimate:
+            return fast_plots.DecimatedLine(ax, x, y, *args, **kwargs)
+        return ax.plot(x, y, *args, **kwargs)
+    
+    def plot_curve(self, ax, func, x0, x1, *args, **kwargs):
+        #fitted curve; in decimated mode it is re-evaluated at pixel resolution on zoom and pan
+        if self.decimate:
+            return fast_plots.ResampledCurve(ax, func, x0, x1, *args, **kwargs)
+        x_dense = np.linspace(x0, x1, 200)
+        return ax.plot(x_dense, func(x_dense), *args, **kwargs)
+    
     def create_plots(self):
         #create a figure with 2 subplots
         fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(10, 5))
         fig.set_tight_layout(True)
         
-        #cubic Spline for 3-point dataset
-        cs_subset = CubicSpline(self.days_subset, self.aqi_subset)
-        x_dense_subset = np.linspace(2, 4, 200)
-        y_dense_subset = cs_subset(x_dense_subset)
-        
-        #least Squares Fit for 3 points (Degree 2)
-        ls_fit_subset_2 = self.least_squares_fit(self.days_subset, self.aqi_subset, degree=2)
-        y_ls_subset_2 = ls_fit_subset_2(x_dense_subset)
-        
-        #least Squares Fit for 3 points (Degree 3)
-        ls_fit_subset_3 = self.least_squares_fit(self.days_subset, self.aqi_subset, degree=3)
-        y_ls_subset_3 = ls_fit_subset_3(x_dense_subset)
+        #cubic Spline and least Squares Fits (Degrees 2 and 3) for 3-point dataset, in one call
+        fits_subset = aqi_fitting.station_models(*aqi_fitting.fit_group(self.days_subset, self.aqi_subset, degrees=(2, 3)), 0)
+        cs_subset = fits_subset['spline']
+        ls_fit_subset_2 = fits_subset['least_squares'][2]
+        ls_fit_subset_3 = fits_subset['least_squares'][3]
         
         #plot for 3-point dataset
-        ax1.plot(self.days_subset, self.aqi_subset, 'o', label='Subset Data (3 pts)')
-        ax1.plot(x_dense_subset, y_dense_subset, '-', label='Cubic Spline')
-        ax1.plot(x_dense_subset, y_ls_subset_2, '--', label='Least Squares (Degree 2)', color='purple')
-        ax1.plot(x_dense_subset, y_ls_subset_3, ':', label='Least Squares (Degree 3)', color='green')
+        x0, x1 = self.days_subset[0], self.days_subset[-1]
+        self.plot_points(ax1, self.days_subset, self.aqi_subset, 'o', label='Subset Data (3 pts)')
+        self.plot_curve(ax1, cs_subset, x0, x1, '-', label='Cubic Spline')
+        self.plot_curve(ax1, ls_fit_subset_2, x0, x1, '--', label='Least Squares (Degree 2)', color='purple')
+        self.plot_curve(ax1, ls_fit_subset_3, x0, x1, ':', label='Least Squares (Degree 3)', color='green')
         ax1.axvline(x=self.x_new, linestyle='--', color='gray', alpha=0.5)
         ax1.set_title('Cubic Spline and Least Squares Fits (3 Points)')
         ax1.set_xlabel('Day')
@@ -214,24 +222,18 @@ class AQIAnalysisGUI(QWidget):
         ax1.legend()
         ax1.grid(True, alpha=0.3)
         
-        #cubic Spline for full dataset
-        cs_full = CubicSpline(self.days_full, self.aqi_full)
-        x_dense_full = np.linspace(1, 5, 200)
-        y_dense_full = cs_full(x_dense_full)
-        
-        #least Squares Fit for full dataset (Degree 2)
-        ls_fit_full_2 = self.least_squares_fit(self.days_full, self.aqi_full, degree=2)
-        y_ls_full_2 = ls_fit_full_2(x_dense_full)
-        
-        #least Squares Fit for full dataset (Degree 3)
-        ls_fit_full_3 = self.least_squares_fit(self.days_full, self.aqi_full, degree=3)
-        y_ls_full_3 = ls_fit_full_3(x_dense_full)
+        #cubic Spline and least Squares Fits (Degrees 2 and 3) for full dataset, in one call
+        fits_full = aqi_fitting.station_models(*aqi_fitting.fit_group(self.days_full, self.aqi_full, degrees=(2, 3)), 0)
+        cs_full = fits_full['spline']
+        ls_fit_full_2 = fits_full['least_squares'][2]
+        ls_fit_full_3 = fits_full['least_squares'][3]
         
         #plot for full dataset
-        ax2.plot(self.days_full, self.aqi_full, 'o', label='Full AQI Data')
-        ax2.plot(x_dense_full, y_dense_full, '-', label='Cubic Spline')
-        ax2.plot(x_dense_full, y_ls_full_2, '--', label='Least Squares (Degree 2)', color='purple')
-        ax2.plot(x_dense_full, y_ls_full_3, ':', label='Least Squares (Degree 3)', color='green')
+        x0, x1 = self.days_full[0], self.days_full[-1]
+        self.plot_points(ax2, self.days_full, self.aqi_full, 'o', label='Full AQI Data')
+        self.plot_curve(ax2, cs_full, x0, x1, '-', label='Cubic Spline')
+        self.plot_curve(ax2, ls_fit_full_2, x0, x1, '--', label='Least Squares (Degree 2)', color='purple')
+        self.plot_curve(ax2, ls_fit_full_3, x0, x1, ':', label='Least Squares (Degree 3)', color='green')
         ax2.axvline(x=self.x_new, linestyle='--', color='gray', alpha=0.5)
         ax2.set_title('Cubic Spline and Least Squares Fits (Full Data)')
         ax2.set_xlabel('Day')
@@ -265,13 +267,10 @@ class AQIAnalysisGUI(QWidget):
         self.data_layout.addWidget(title)
         
         #data text
+        readings = "".join(f"Day {day}: {aqi}\n" for day, aqi in zip(self.days_full, self.aqi_full))
         data_text = (
             "This analysis uses the following Air Quality Index (AQI) values:\n\n"
-            "Day 1: 75\n"
-            "Day 2: 80\n"
-            "Day 3: 78\n"
-            "Day 4: 82\n"
-            "Day 5: 77\n\n"
+            f"{readings}\n"
             "The 3-point dataset uses only days 2, 3, and 4.\n"
             "The full dataset uses all five days.\n\n"
             "We are estimating the AQI value at day 2.5 using various interpolation methods."
@@ -294,7 +293,9 @@ class AQIAnalysisGUI(QWidget):
             "3. Neville's Algorithm: Another form of polynomial interpolation with good numerical stability.\n\n"
             "4. Cubic Spline: Creates a piecewise cubic polynomial that is smooth at the knots (data points).\n\n"
             "5. Least Squares Fit: Finds a polynomial of specified degree that minimizes the sum of squared "
-            "errors between the polynomial and the data points."
+            "errors between the polynomial and the data points.\n\n"
+            "6. Barycentric Interpolation: The same polynomial as Lagrange, evaluated from weights computed "
+            "once per dataset, so many points can be resampled quickly and stably."
         )
         
         methods_label = QLabel(methods_text)
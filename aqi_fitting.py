@@ -0,0 +1,169 @@
+"""Cubic-spline and least-squares fits for many AQI stations at once.
+
+Stations sampled on the same days form a group. Each group is fitted in one
+vectorized call: one CubicSpline along the station axis, and, for each
+degree, one column-scaled Vandermonde QR factorization shared by the
+least-squares fits of every station. When there are several groups (each
+station has its own days, or its own gaps in an AQIStore block), they are
+spread over a process pool.
+
+    result = fit_block(days, readings, names)      #readings (stations, days), NaN = missing
+    result['fits']['Station 12']['least_squares'][2](10.5)
+    print(result['timing'])
+
+Run as a script to fit every station of an AQI store:
+
+    python aqi_fitting.py aqi_store --start 2023-01-01 --stop 2023-02-01 --output fits.npz
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+import numpy as np
+from scipy import linalg
+from scipy.interpolate import CubicSpline, PPoly
+
+import aqi_store
+
+#least-squares degrees fitted by default, as in the AQI plots
+LS_DEGREES = (2, 3)
+
+#below this many readings in total, the groups are fitted in this process
+#because starting the pool costs more than it saves
+MIN_POOL_READINGS = 200000
+
+
+def fit_group(x, Y, degrees=LS_DEGREES):
+    #(spline, {degree: coefficients}) for the rows of Y sampled at the days x;
+    #the spline covers every row (None for a single day) and the (stations, degree + 1)
+    #coefficients are highest power first, like np.polyfit
+    x = np.asarray(x, dtype=np.float64)
+    Y = np.asarray(Y, dtype=np.float64).reshape(-1, len(x))
+    spline = CubicSpline(x, Y, axis=1) if len(x) > 1 else None
+    coefficients = {}
+    for degree in degrees:
+        V = np.vander(x, degree + 1)
+        #scaled columns keep the Vandermonde matrix well conditioned, as np.polyfit does
+        scale = np.sqrt((V * V).sum(axis=0))
+        scale[scale == 0] = 1.0
+        V /= scale
+        if degree < len(x):
+            Q, R = linalg.qr(V, mode='economic')
+            c = linalg.solve_triangular(R, Q.T @ Y.T)
+        else:
+            #fewer days than coefficients: the minimum-norm fit, as np.polyfit returns
+            c = np.linalg.lstsq(V, Y.T, rcond=None)[0]
+        coefficients[degree] = c.T / scale
+    return spline, coefficients
+
+
+def station_models(spline, coefficients, k):
+    #per-station models of row k of a fit_group result; the spline is a view of the batch
+    models = {'spline': None, 'least_squares': {degree: np.poly1d(c[k]) for degree, c in coefficients.items()}}
+    if spline is not None:
+        models['spline'] = PPoly.construct_fast(spline.c[:, :, k], spline.x)
+    return models
+
+
+def fit_task(task):
+    #pool worker: fit one group of stations
+    x, Y, degrees = task
+    t0 = time.perf_counter()
+    spline, coefficients = fit_group(x, Y, degrees)
+    return spline, coefficients, time.perf_counter() - t0
+
+
+def fit_groups(groups, degrees=LS_DEGREES, workers=None):
+    #fit a list of (names, days, readings) groups; a dict of per-station models and timing
+    t0 = time.perf_counter()
+    workers = workers or os.cpu_count() or 1
+    readings = sum(np.size(Y) for _, _, Y in groups)
+    tasks = [(x, Y, degrees) for _, x, Y in groups]
+    pooled = workers > 1 and len(groups) > 1 and readings >= MIN_POOL_READINGS
+    if pooled:
+        ctx = multiprocessing.get_context('spawn')
+        with ctx.Pool(min(workers, len(groups))) as pool:
+            results = pool.map(fit_task, tasks, chunksize=max(1, len(tasks) // (4 * workers)))
+    else:
+        results = [fit_task(task) for task in tasks]
+
+    fits = {}
+    for (names, _, _), (spline, coefficients, _) in zip(groups, results):
+        for k, name in enumerate(names):
+            fits[name] = station_models(spline, coefficients, k)
+    return {
+        'fits': fits,
+        'timing': {
+            'total': time.perf_counter() - t0,
+            'fit': sum(result[2] for result in results),
+            'groups': len(groups),
+            'stations': len(fits),
+            'workers': min(workers, len(groups)) if pooled else 1,
+        },
+    }
+
+
+def fit_series(series, degrees=LS_DEGREES, workers=None):
+    #fit {name: (days, readings)}; stations with identical days share one group
+    groups = {}
+    for name, (x, y) in series.items():
+        x = np.asarray(x, dtype=np.float64)
+        names, _, rows = groups.setdefault(x.tobytes(), ([], x, []))
+        names.append(name)
+        rows.append(np.asarray(y, dtype=np.float64))
+    return fit_groups([(names, x, np.vstack(rows)) for names, x, rows in groups.values()], degrees, workers)
+
+
+def fit_block(x, Y, names=None, degrees=LS_DEGREES, workers=None):
+    #fit the rows of a (stations, days) block with NaN for missing readings; rows with
+    #the same missing pattern (all complete rows, typically) share one group
+    x = np.asarray(x, dtype=np.float64)
+    Y = np.asarray(Y, dtype=np.float64)
+    names = list(range(len(Y))) if names is None else list(names)
+    present = np.isfinite(Y)
+    patterns, group = np.unique(np.packbits(present, axis=1), axis=0, return_inverse=True)
+    groups = []
+    for g in range(len(patterns)):
+        rows = np.flatnonzero(group.ravel() == g)
+        days = present[rows[0]]
+        if days.any():
+            groups.append(([names[k] for k in rows], x[days], Y[np.ix_(rows, days)]))
+    return fit_groups(groups, degrees, workers)
+
+
+def fit_store(store, start=None, stop=None, degrees=LS_DEGREES, workers=None):
+    #fit every station of an AQIStore over start <= t < stop, in days from the first time
+    times, values = store.block(start, stop)
+    return fit_block(aqi_store.to_days(times), values, store.stations.tolist(), degrees, workers)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fit splines and least-squares polynomials to every station of an AQI store.")
+    parser.add_argument('store', help="AQI store directory (see aqi_store)")
+    parser.add_argument('--start', help="first time to fit")
+    parser.add_argument('--stop', help="end of the time range (exclusive)")
+    parser.add_argument('--degrees', type=int, nargs='+', default=list(LS_DEGREES), help="least-squares degrees")
+    parser.add_argument('--workers', type=int, help="process pool size (default: one per core)")
+    parser.add_argument('--output', help=".npz file for the stations and their least-squares coefficients")
+    args = parser.parse_args(argv)
+
+    store = aqi_store.AQIStore(args.store)
+    result = fit_store(store, args.start, args.stop, args.degrees, args.workers)
+    if args.output:
+        names = list(result['fits'])
+        arrays = {'stations': np.array([str(name) for name in names])}
+        for degree in args.degrees:
+            #poly1d drops zero leading coefficients; pad back to degree + 1
+            arrays[f"least_squares_{degree}"] = np.array([
+                np.pad(c, (degree + 1 - len(c), 0))
+                for c in (result['fits'][name]['least_squares'][degree].c for name in names)])
+        np.savez(args.output, **arrays)
+    print(json.dumps(result['timing']))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
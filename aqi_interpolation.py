@@ -0,0 +1,225 @@
+"""Qt-free interpolation and smoothing methods for the AQI trends problem (B7).
+
+The barycentric form is the engine for dense resampling: the weights cost
+O(n^2) once per dataset, after which every query point costs O(n),
+
+    p(t) = sum_j w_j y_j / (t - x_j)  /  sum_j w_j / (t - x_j),
+
+    weights = barycentric_weights(days)
+    curve = barycentric_interpolation(days, aqi, np.linspace(1, 5, 10000), weights)
+
+Lagrange, Newton and Neville build the same polynomial and are kept as
+cross-checks. neville_batch runs the Neville tableau on a whole array of
+points at once and also returns its error estimates.
+
+SlidingNewton keeps the Newton form of the last few readings of a live
+stream. Each new reading or eviction updates the divided differences in
+O(window), and no refit is needed:
+
+    live = SlidingNewton(window=4)
+    for hour, aqi in readings:
+        live.append(hour, aqi)
+        estimate = live(hour + 0.5)
+"""
+import numpy as np
+from scipy.interpolate import lagrange, CubicSpline
+
+#largest (rows x nodes) temporary built at once by the barycentric routines
+CHUNK_ELEMENTS = 1 << 20
+
+#readings in the streaming interpolant: a local cubic, not a global high-degree polynomial
+SLIDING_WINDOW = 4
+
+
+def lagrange_interpolation(x, y, x_new):
+    #Lagrange interpolation
+    poly = lagrange(x, y)
+    return poly(x_new)
+
+
+def newton_divided_diff(x, y):
+    #compute divided difference coefficients.
+    n = len(x)
+    coef = np.copy(y).astype(float)
+    for j in range(1, n):
+        coef[j:n] = (coef[j:n] - coef[j - 1:n - 1]) / (x[j:n] - x[0:n - j])
+    return coef
+
+
+def newton_interpolation(x, coef, x_new):
+    #Newton interpolation
+    n = len(coef)
+    result = coef[0]
+    product = 1.0
+    for i in range(1, n):
+        product *= (x_new - x[i - 1])
+        result += coef[i] * product
+    return result
+
+
+class SlidingNewton:
+    #Newton interpolant of the last `window` readings x_0 (oldest) .. x_{k-1} (newest), kept
+    #as the table diagonal diagonal[j] = f[x_{k-1-j}..x_{k-1}]: the Newton coefficients for
+    #the nodes taken newest first. Appending derives the new diagonal from the old one,
+    #evicting drops its last entry, and rounding errors cannot build up along the stream
+    def __init__(self, window=SLIDING_WINDOW):
+        if window < 1:
+            raise ValueError("window must hold at least one reading")
+        self.window = window
+        self.x = np.empty(0)
+        self.diagonal = np.empty(0)
+
+    def __len__(self):
+        return len(self.x)
+
+    def append(self, x_new, y_new):
+        #add a reading, evicting the oldest one when the window is full
+        x_new, y_new = float(x_new), float(y_new)
+        #the oldest reading leaves before the new one arrives, so it is no duplicate
+        full = len(self) == self.window
+        if np.any(self.x[int(full):] == x_new):
+            raise ValueError(f"a reading at {x_new} is already in the window")
+        if full:
+            self.evict()
+        #f[x_new], f[x_{k-1}, x_new], ..., f[x_0..x_new]
+        diagonal = np.empty(len(self) + 1)
+        diagonal[0] = y_new
+        for j in range(1, len(diagonal)):
+            diagonal[j] = (diagonal[j - 1] - self.diagonal[j - 1]) / (x_new - self.x[-j])
+        self.x = np.append(self.x, x_new)
+        self.diagonal = diagonal
+
+    def extend(self, xs, ys):
+        for x_new, y_new in zip(xs, ys):
+            self.append(x_new, y_new)
+
+    def evict(self):
+        #drop the oldest reading; only the highest divided difference involves it
+        if not len(self):
+            raise IndexError("evict from an empty window")
+        self.x = self.x[1:]
+        self.diagonal = self.diagonal[:-1]
+
+    def __call__(self, x_new):
+        #value of the window's interpolant at a scalar or an array of points (Horner in Newton form)
+        if not len(self):
+            raise ValueError("no readings to interpolate")
+        x_new = np.asarray(x_new, dtype=np.float64)
+        nodes = self.x[::-1]
+        result = np.full(x_new.shape, self.diagonal[-1])
+        for j in range(len(self) - 2, -1, -1):
+            result = result * (x_new - nodes[j]) + self.diagonal[j]
+        return result
+
+
+def neville_interpolation(x, y, x_new):
+    #Neville interpolation
+    n = len(x)
+    Q = np.zeros((n, n))
+    Q[:, 0] = y
+    for j in range(1, n):
+        for i in range(n - j):
+            Q[i][j] = ((x_new - x[i + j]) * Q[i][j - 1] -
+                      (x_new - x[i]) * Q[i + 1][j - 1]) / (x[i] - x[i + j])
+    return Q[0, n - 1]
+
+
+def neville_batch(x, y, x_new, chunk_elements=CHUNK_ELEMENTS):
+    #(values, error estimates) of Neville's tableau at a scalar or an array of points;
+    #each chunk of m points keeps only the current (m, n) diagonal, and the error
+    #estimate is the last correction, taken from the degree n-2 interpolant that
+    #drops the end node farther from the point
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    x_new = np.asarray(x_new, dtype=np.float64)
+    points = x_new.ravel()
+    n = len(x)
+    values = np.empty(len(points))
+    errors = np.zeros(len(points))
+    step = max(1, chunk_elements // (2 * n))
+    for start in range(0, len(points), step):
+        t = points[start:start + step]
+        diff = t[:, None] - x[None, :]
+        Q = np.tile(y, (len(t), 1))
+        for j in range(1, n):
+            if j == n - 1:
+                previous = Q[:, :2].copy()
+            Q[:, :n - j] = (diff[:, j:] * Q[:, :n - j] - diff[:, :n - j] * Q[:, 1:n - j + 1]) / (x[:n - j] - x[j:])
+        values[start:start + step] = Q[:, 0]
+        if n > 1:
+            #Q[:, 0] of the last diagonal omits x[n-1], Q[:, 1] omits x[0]
+            nearer = np.where(np.abs(diff[:, 0]) > np.abs(diff[:, -1]), previous[:, 1], previous[:, 0])
+            errors[start:start + step] = np.abs(Q[:, 0] - nearer)
+    return values.reshape(x_new.shape), errors.reshape(x_new.shape)
+
+
+def barycentric_weights(x):
+    #w_j = 1 / prod_{k != j} (x_j - x_k), scaled to max |w| = 1 (the formula is
+    #invariant to scaling); summed as logs so many nodes do not overflow
+    x = np.asarray(x, dtype=np.float64)
+    n = len(x)
+    log_w = np.empty(n)
+    negative = np.empty(n, dtype=np.int64)
+    step = max(1, CHUNK_ELEMENTS // max(n, 1))
+    for start in range(0, n, step):
+        diff = x[start:start + step, None] - x[None, :]
+        rows = np.arange(len(diff))
+        diff[rows, start + rows] = 1.0
+        with np.errstate(divide='ignore'):
+            log_w[start:start + step] = -np.log(np.abs(diff)).sum(axis=1)
+        negative[start:start + step] = (diff < 0).sum(axis=1)
+    if not np.all(np.isfinite(log_w)):
+        raise ValueError("interpolation nodes must be distinct")
+    return np.where(negative % 2, -1.0, 1.0) * np.exp(log_w - log_w.max())
+
+
+def barycentric_interpolation(x, y, x_new, weights=None):
+    #evaluate the interpolating polynomial at a scalar or an array of points in O(n)
+    #per point; y may be (n,) or (n, k) for k series on the same days
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    w = barycentric_weights(x) if weights is None else weights
+    x_new = np.asarray(x_new, dtype=np.float64)
+    points = x_new.ravel()
+    result = np.empty((len(points),) + y.shape[1:])
+    step = max(1, CHUNK_ELEMENTS // max(len(x), 1))
+    for start in range(0, len(points), step):
+        diff = points[start:start + step, None] - x[None, :]
+        exact = diff == 0
+        with np.errstate(divide='ignore', invalid='ignore'):
+            c = w / diff
+            denominator = c.sum(axis=1)
+            values = (c @ y) / denominator.reshape((-1,) + (1,) * (y.ndim - 1))
+        #a query on a node returns the data there (the formula is 0/0 or inf/inf)
+        rows, nodes = np.nonzero(exact)
+        values[rows] = y[nodes]
+        result[start:start + step] = values
+    return result.reshape(x_new.shape + y.shape[1:])
+
+
+def least_squares_fit(x, y, degree=2):
+    #polynomial using least squares
+    coeffs = np.polyfit(x, y, degree)
+    poly = np.poly1d(coeffs)
+    return poly
+
+
+def interpolate_all(x, y, x_new, neville=None):
+    #estimate y(x_new) with every interpolation method; floats for a scalar x_new,
+    #arrays for an array of points. neville is a neville_batch result for the same
+    #points, for callers that also need its error estimates
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    points = np.asarray(x_new, dtype=np.float64)
+    coef = newton_divided_diff(x, y)
+    estimates = {
+        'Barycentric': barycentric_interpolation(x, y, points),
+        'Lagrange': lagrange_interpolation(x, y, points),
+        'Newton': newton_interpolation(x, coef, points),
+        'Neville': (neville_batch(x, y, points) if neville is None else neville)[0],
+        'Cubic Spline': CubicSpline(x, y)(points),
+        'Least Squares': least_squares_fit(x, y, min(2, len(x) - 1))(points),
+    }
+    if points.ndim == 0:
+        return {method: float(value) for method, value in estimates.items()}
+    return {method: np.broadcast_to(value, points.shape).astype(np.float64) for method, value in estimates.items()}
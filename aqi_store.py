@@ -0,0 +1,194 @@
+"""Columnar, memory-mapped store of multi-station AQI readings.
+
+build_store parses a CSV of readings once, a chunk at a time, and writes a
+directory of .npy files:
+
+- ``timestamps.npy``: sorted reading times shared by all stations
+  (datetime64[s], or float64 for a numeric day/hour column)
+- ``stations.npy``: station names
+- ``values.npy``: float32 readings of shape (stations, times), NaN where a
+  station has no reading; every station's series is one contiguous row
+
+AQIStore memory-maps these files, so a station or a time range is a
+zero-copy slice and the CSV is never parsed again:
+
+    store = build_store('readings.csv', 'aqi_store')
+    times, aqi = store.series('Station 12', '2023-01-01', '2023-02-01')
+
+Two CSV layouts are read:
+
+- long: ``time, station, aqi``, one reading per line, under a header whose
+  second column is ``station``
+- wide: ``time, <station>, <station>, ...``, one row per time; the header
+  names the stations (without one they are numbered from 1)
+
+Empty, ``NA`` and ``N/A`` readings are stored as NaN. If a station has
+several readings at the same time, the last one is kept.
+"""
+import argparse
+import os
+import sys
+import warnings
+
+import numpy as np
+
+#CSV lines parsed per chunk
+CHUNK_ROWS = 10**6
+
+#readings stored as NaN
+MISSING = ('', 'NA', 'N/A')
+
+
+class AQIStore:
+    #read-only view of a build_store directory; timestamps and values are memory-mapped
+    def __init__(self, store_dir):
+        self.path = store_dir
+        self.timestamps = np.load(os.path.join(store_dir, 'timestamps.npy'), mmap_mode='r')
+        self.stations = np.load(os.path.join(store_dir, 'stations.npy'))
+        self.values = np.load(os.path.join(store_dir, 'values.npy'), mmap_mode='r')
+        self.index = {name: i for i, name in enumerate(self.stations.tolist())}
+
+    def __len__(self):
+        return len(self.stations)
+
+    def station_index(self, station):
+        #row of a station given by name or by position
+        if isinstance(station, (int, np.integer)):
+            if not -len(self) <= station < len(self):
+                raise IndexError(f"station {station} out of range for {len(self)} stations")
+            return int(station) % len(self)
+        try:
+            return self.index[str(station)]
+        except KeyError:
+            raise KeyError(f"unknown station {station!r}") from None
+
+    def time_range(self, start=None, stop=None):
+        #slice of the time axis with start <= t < stop; bounds are times or ISO strings
+        lo = 0 if start is None else int(np.searchsorted(self.timestamps, self.to_time(start)))
+        hi = len(self.timestamps) if stop is None else int(np.searchsorted(self.timestamps, self.to_time(stop)))
+        return slice(lo, hi)
+
+    def to_time(self, t):
+        return np.asarray(t, dtype=self.timestamps.dtype)
+
+    def series(self, station, start=None, stop=None):
+        #(times, readings) of one station, both views into the memory maps
+        window = self.time_range(start, stop)
+        return self.timestamps[window], self.values[self.station_index(station), window]
+
+    def block(self, start=None, stop=None):
+        #(times, readings) of every station over a time range, shape (stations, times), no copy
+        window = self.time_range(start, stop)
+        return self.timestamps[window], self.values[:, window]
+
+
+def to_days(times, origin=None):
+    #float days since origin (default the first time), for the interpolation methods;
+    #numeric times are returned unchanged
+    times = np.asarray(times)
+    if not np.issubdtype(times.dtype, np.datetime64):
+        return times.astype(np.float64)
+    origin = times.ravel()[0] if origin is None else np.asarray(origin, dtype=times.dtype)
+    return (times - origin) / np.timedelta64(1, 'D')
+
+
+def parse_times(column):
+    #numeric times stay float64, anything else is parsed as ISO date/time
+    try:
+        return column.astype(np.float64)
+    except ValueError:
+        return np.array(column, dtype='datetime64[s]')
+
+
+def parse_values(columns):
+    return np.where(np.isin(columns, MISSING), 'nan', columns).astype(np.float32)
+
+
+def is_time(token):
+    try:
+        parse_times(np.array([token]))
+    except ValueError:
+        return False
+    return True
+
+
+def read_readings(csv_path, chunk_rows=CHUNK_ROWS):
+    #(times, station names, station codes, readings) of a long CSV, or
+    #(times, station names, None, (times, stations) readings) of a wide one
+    with open(csv_path) as f:
+        first = [token.strip() for token in f.readline().split(',')]
+        header = not is_time(first[0])
+        if not header:
+            f.seek(0)
+        layout = 'long' if header and len(first) == 3 and first[1].lower() == 'station' else 'wide'
+
+        times, names, codes, values = [], [], [], []
+        with warnings.catch_warnings():
+            #loadtxt warns when the last read finds the end of the file
+            warnings.simplefilter('ignore', UserWarning)
+            while True:
+                chunk = np.loadtxt(f, delimiter=',', dtype=str, comments='#', max_rows=chunk_rows, ndmin=2)
+                if chunk.size == 0:
+                    break
+                chunk = np.char.strip(chunk)
+                times.append(parse_times(chunk[:, 0]))
+                if layout == 'long':
+                    chunk_names, chunk_codes = np.unique(chunk[:, 1], return_inverse=True)
+                    names.append(chunk_names)
+                    codes.append(chunk_codes.astype(np.int32))
+                    values.append(parse_values(chunk[:, 2]))
+                else:
+                    values.append(parse_values(chunk[:, 1:]))
+
+    if not times:
+        raise ValueError(f"{csv_path} has no readings")
+    if len({t.dtype.kind for t in times}) > 1:
+        raise ValueError(f"{csv_path} mixes numeric and date/time timestamps")
+    times = np.concatenate(times)
+    values = np.concatenate(values)
+    if layout == 'wide':
+        stations = np.array(first[1:] if header else [str(k) for k in range(1, values.shape[1] + 1)])
+        return times, stations, None, values
+
+    #station codes are per chunk; map them to the sorted names of the whole file
+    stations = np.unique(np.concatenate(names))
+    codes = np.concatenate([np.searchsorted(stations, chunk_names)[chunk_codes]
+                            for chunk_names, chunk_codes in zip(names, codes)])
+    return times, stations, codes, values
+
+
+def build_store(csv_path, store_dir, chunk_rows=CHUNK_ROWS):
+    #parse csv_path once and write the columnar store to store_dir; returns the opened AQIStore
+    times, stations, codes, readings = read_readings(csv_path, chunk_rows)
+    timestamps, column = np.unique(times, return_inverse=True)
+
+    os.makedirs(store_dir, exist_ok=True)
+    np.save(os.path.join(store_dir, 'timestamps.npy'), timestamps)
+    np.save(os.path.join(store_dir, 'stations.npy'), stations)
+    #the readings go straight into the memory-mapped file, never into a dense array in RAM
+    values = np.lib.format.open_memmap(os.path.join(store_dir, 'values.npy'), mode='w+', dtype=np.float32,
+                                       shape=(len(stations), len(timestamps)))
+    values[:] = np.nan
+    if codes is None:
+        values[:, column] = readings.T
+    else:
+        values[codes, column] = readings
+    values.flush()
+    del values
+    return AQIStore(store_dir)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert an AQI readings CSV into a memory-mapped columnar store.")
+    parser.add_argument('csv', help="readings as 'time, station, aqi' lines or one column per station")
+    parser.add_argument('store', help="output directory for the .npy files")
+    args = parser.parse_args(argv)
+
+    store = build_store(args.csv, args.store)
+    times = store.timestamps
+    print(f"{len(store)} stations, {len(times)} times ({times[0]} to {times[-1]}) in {args.store}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,204 @@
+"""Headless batch solver for network flow and AQI problem files.
+
+Solves many problems in one process without importing PyQt5 or matplotlib:
+
+    python batch_solve.py problems/*.npz problems/*.json --output-dir results
+
+A network problem holds a matrix ``A`` (dense, or CSR as ``A_data``,
+``A_indices``, ``A_indptr``, ``A_shape``) and a demand vector ``b``, or an
+``(n, k)`` block of demand scenarios solved with the direct methods.
+Networks can also be read from edge-list, Matrix Market or .npy edge files
+(see network_loader), with demands from ``--demands``.
+An AQI problem holds sample days ``x``, values ``y`` and query day(s) ``x_new``.
+A JSON AQI problem may instead name a ``store`` directory (see aqi_store), a
+``station`` and an optional ``start``/``stop`` time range; ``x_new`` is then
+given as times, and date/time readings are counted in days from the first
+one in the range.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import scipy.sparse as sp
+
+import aqi_interpolation
+import aqi_store
+import network_loader
+import network_solver
+
+
+def load_problem(path, demand_path=None):
+    #read a problem file into a plain dict of arrays
+    if path.endswith('.npz') or path.lower().endswith(network_loader.NETWORK_EXTENSIONS):
+        problem = network_loader.load_network(path, demand_path)
+    elif path.endswith('.json'):
+        with open(path) as f:
+            problem = json.load(f)
+    else:
+        raise ValueError(f"unsupported problem file: {path}")
+
+    if 'store' in problem:
+        problem.update(store_series(problem, os.path.dirname(path)))
+    if 'A_data' in problem:
+        problem['A'] = sp.csr_matrix(
+            (problem.pop('A_data'), problem.pop('A_indices'), problem.pop('A_indptr')),
+            shape=tuple(problem.pop('A_shape')))
+    return problem
+
+
+def store_series(problem, base_dir):
+    #x (days), y and x_new of one station read from an AQI store, without missing readings
+    store = aqi_store.AQIStore(os.path.join(base_dir, problem['store']))
+    times, readings = store.series(problem['station'], problem.get('start'), problem.get('stop'))
+    keep = np.isfinite(readings)
+    if not np.any(keep):
+        raise ValueError(f"station {problem['station']!r} has no readings in the requested range")
+    times = times[keep]
+    series = {'x': aqi_store.to_days(times, times[0]), 'y': readings[keep].astype(np.float64)}
+    if problem.get('x_new') is not None:
+        series['x_new'] = aqi_store.to_days(store.to_time(problem['x_new']), times[0])
+    return series
+
+
+def solve_network(problem, methods, monitor_options=None, precision='double'):
+    #solve one network problem with the selected methods
+    A = problem['A']
+    if not sp.issparse(A):
+        A = np.asarray(A, dtype=np.float64)
+    if problem.get('b') is None:
+        raise ValueError("network problem has no demand vector b (pass --demands for edge lists)")
+    b = np.asarray(problem['b'], dtype=np.float64)
+
+    if b.ndim == 2:
+        #an (n, k) block of demand scenarios is solved with one factorization per method
+        solutions = network_solver.solve_many(A, b, methods=methods, precision=precision)
+    else:
+        solutions = network_solver.compute_solutions(A, b, methods=methods, verbose=False,
+                                                     monitor_options=monitor_options, precision=precision)
+    result = {'kind': 'network', 'n': int(A.shape[0]), 'methods': {}}
+    for method, data in solutions.items():
+        result['methods'][method] = {
+            'solution': data['solution'],
+            'residual': data['residual'] if b.ndim == 2 else float(data['residual']),
+            'time': data['time'],
+            'iterations': data.get('iterations'),
+            'kernel': data.get('kernel'),
+            'status': data.get('status'),
+            'predicted_iterations': data.get('predicted_iterations'),
+            'spectral_radius_converged': data.get('spectral_radius_converged'),
+        }
+    return result
+
+
+def solve_aqi(problem, x_new=None):
+    #interpolate one AQI series at the requested day(s)
+    x = np.asarray(problem['x'], dtype=np.float64)
+    y = np.asarray(problem['y'], dtype=np.float64)
+    x_new = problem.get('x_new', x_new)
+    if x_new is None:
+        raise ValueError("AQI problem has no x_new and none was given on the command line")
+
+    points = np.atleast_1d(np.asarray(x_new, dtype=np.float64))
+    neville = aqi_interpolation.neville_batch(x, y, points)
+    estimates = aqi_interpolation.interpolate_all(x, y, points, neville)
+    methods = {method: {'values': values} for method, values in estimates.items()}
+    methods['Neville']['error_estimates'] = neville[1]
+    return {
+        'kind': 'aqi',
+        'n': int(len(x)),
+        'x_new': points,
+        'methods': methods,
+    }
+
+
+def solve_problem(path, methods=network_solver.METHODS, x_new=None, monitor_options=None, demand_path=None,
+                  precision='double'):
+    #dispatch a problem file to the network or AQI solver
+    problem = load_problem(path, demand_path)
+    if 'A' in problem:
+        return solve_network(problem, methods, monitor_options, precision)
+    if 'x' in problem and 'y' in problem:
+        return solve_aqi(problem, x_new)
+    raise ValueError(f"{path} is neither a network (A, b) nor an AQI (x, y) problem")
+
+
+def to_json(value):
+    #convert numpy values to plain JSON types
+    if isinstance(value, dict):
+        return {key: to_json(val) for key, val in value.items()}
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def write_result(result, output_dir, name, fmt):
+    #write one result as <name>.json or <name>.npz
+    if fmt == 'json':
+        with open(os.path.join(output_dir, name + '.json'), 'w') as f:
+            json.dump(to_json(result), f)
+        return
+
+    arrays = {'kind': result['kind'], 'n': result['n']}
+    if 'x_new' in result:
+        arrays['x_new'] = result['x_new']
+    for method, data in result['methods'].items():
+        for key, val in data.items():
+            if val is not None:
+                arrays[f"{method}/{key}"] = val
+    np.savez(os.path.join(output_dir, name + '.npz'), **arrays)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Solve network flow and AQI problem files without the GUI.")
+    parser.add_argument('problems', nargs='+',
+                        help="problem files (.npz, .json, or .csv/.txt/.edges/.mtx/.npy networks)")
+    parser.add_argument('-o', '--output-dir', default='results', help="directory for result files")
+    parser.add_argument('-f', '--format', choices=('json', 'npz'), default='json', help="result file format")
+    parser.add_argument('-m', '--methods', nargs='+', choices=network_solver.METHODS + network_solver.PARALLEL_METHODS,
+                        default=list(network_solver.METHODS), help="network solvers to run")
+    parser.add_argument('--x-new', type=float, help="AQI query day for files that do not set x_new")
+    parser.add_argument('--demands', help="node demand file for network files that do not store b")
+    parser.add_argument('--cache-mb', type=float, default=256,
+                        help="memory cap for factorizations shared between problems with the same matrix")
+    parser.add_argument('--criterion', choices=('update', 'residual'), default='update',
+                        help="stopping criterion of the iterative methods")
+    parser.add_argument('--history-stride', type=int, default=0,
+                        help="record every N-th iteration of the convergence history (0 = none)")
+    parser.add_argument('--precision', choices=('double', 'mixed'), default='double',
+                        help="mixed: factor SVD/Gauss systems in float32 and refine to float64 accuracy")
+    args = parser.parse_args(argv)
+    monitor_options = {'criterion': args.criterion, 'stride': args.history_stride,
+                       'record': args.history_stride > 0}
+    network_solver.default_cache.max_bytes = int(args.cache_mb * 2**20)
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    summary = {'solved': 0, 'failed': {}}
+    t0 = time.perf_counter()
+
+    for path in args.problems:
+        name = os.path.splitext(os.path.basename(path))[0]
+        try:
+            result = solve_problem(path, args.methods, args.x_new, monitor_options, args.demands,
+                                   args.precision)
+        except Exception as e:
+            summary['failed'][path] = str(e)
+            print(f"{path}: {e}", file=sys.stderr)
+            continue
+        write_result(result, args.output_dir, name, args.format)
+        summary['solved'] += 1
+
+    summary['time'] = time.perf_counter() - t0
+    summary['factor_cache'] = network_solver.default_cache.stats()
+    with open(os.path.join(args.output_dir, 'summary.json'), 'w') as f:
+        json.dump(summary, f, indent=2)
+    print(f"Solved {summary['solved']} of {len(args.problems)} problems in {summary['time']:.2f} s")
+    return 1 if summary['failed'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
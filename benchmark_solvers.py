@@ -0,0 +1,265 @@
+"""Scaling benchmark for the network flow solvers.
+
+Generates graph-Laplacian (2-D grid) and tridiagonal networks of increasing size,
+runs every solver with warmups and repeats, and writes one record per
+(problem, size, storage, method) with time, peak memory, iterations and residual.
+Memory comes from one extra untimed run in a fresh process, so the timings are
+never traced and the resident-set peak belongs to that solve alone:
+
+    python benchmark_solvers.py --sizes 10 100 1000 10000 --output benchmark_results.json
+"""
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import scipy
+import scipy.sparse as sp
+
+import network_solver
+
+try:
+    import resource
+except ImportError:
+    #Windows has neither /proc nor getrusage; only the traced peak is recorded there
+    resource = None
+
+SIZES = (10, 100, 1000, 10**4, 10**5, 10**6)
+
+#largest dense matrix the suite will build (a 2000 x 2000 float64 matrix is 32 MB)
+DENSE_LIMIT = 2000
+
+#largest size at which each method is still practical, per storage format
+METHOD_LIMITS = {
+    'SVD': {'dense': 2000, 'sparse': 10**6},
+    'Gauss': {'dense': 2000, 'sparse': 10**6},
+    'Jacobi': {'dense': 2000, 'sparse': 10**6},
+    'Gauss-Seidel': {'dense': 2000, 'sparse': 10**5},
+    'SOR': {'dense': 2000, 'sparse': 10**5},
+    'Laplacian': {'dense': 2000, 'sparse': 10**6},
+    'Block-Jacobi': {'dense': 2000, 'sparse': 10**6},
+}
+
+
+def laplacian_network(n, seed=0):
+    #Laplacian of a near-square 2-D grid of about n nodes with balanced demands
+    rows = max(int(np.sqrt(n)), 1)
+    cols = max(n // rows, 1)
+    path = lambda m: sp.diags([np.ones(m - 1)], [1], shape=(m, m))
+    adjacency = sp.kron(sp.eye(rows), path(cols)) + sp.kron(path(rows), sp.eye(cols))
+    adjacency = adjacency + adjacency.T
+    A = sp.csr_matrix(sp.diags(np.asarray(adjacency.sum(axis=1)).ravel()) - adjacency)
+    b = np.random.default_rng(seed).normal(size=A.shape[0])
+    return A, b - b.mean()
+
+
+def tridiagonal_network(n, seed=0):
+    #nonsingular tridiagonal chain (grounded path Laplacian)
+    A = sp.diags([-np.ones(n - 1), 2 * np.ones(n), -np.ones(n - 1)], [-1, 0, 1], format='csr')
+    b = np.random.default_rng(seed).normal(size=n)
+    return A, b
+
+
+PROBLEMS = {'laplacian': laplacian_network, 'tridiagonal': tridiagonal_network}
+
+
+def run_method(A, b, method):
+    #one uncached solve; returns (seconds, iterations, residual)
+    t0 = time.perf_counter()
+    data = network_solver.compute_solutions(A, b, methods=(method,), verbose=False, cache=None,
+                                            monitor_options={'record': False})
+    elapsed = time.perf_counter() - t0
+    if method not in data:
+        return None
+    data = data[method]
+    iterations = data.get('iterations')
+    return elapsed, iterations, float(data['residual'])
+
+
+def proc_rss():
+    #(current, high-water) resident set of this process in bytes from /proc (Linux), or None
+    try:
+        with open('/proc/self/status') as f:
+            fields = dict(line.split(':', 1) for line in f if ':' in line)
+        return int(fields['VmRSS'].split()[0]) * 1024, int(fields['VmHWM'].split()[0]) * 1024
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def rss_baseline():
+    #start a resident-set measurement: on Linux the high-water mark is reset to the
+    #current size; elsewhere ru_maxrss, which a spawned process inherits from its
+    #parent, is only a lower bound for the baseline
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return ('proc', proc_rss()[0])
+    except (OSError, TypeError):
+        pass
+    if resource is None:
+        return None
+    return ('rusage', resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+
+
+def rss_growth(baseline):
+    #bytes the resident-set peak rose above the baseline, or None
+    if baseline is None:
+        return None
+    kind, before = baseline
+    if kind == 'proc':
+        return proc_rss()[1] - before
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - before
+    #ru_maxrss is in KB on Linux and in bytes on macOS
+    return rss if sys.platform == 'darwin' else rss * 1024
+
+
+def memory_task(A, b, method):
+    #pool worker in a fresh process: (traced peak, resident-set growth) of one solve.
+    #tracemalloc sees Python/NumPy allocations only; the resident-set growth also
+    #counts the SuperLU/LAPACK workspace that dominates the direct solvers
+    baseline = rss_baseline()
+    tracemalloc.start()
+    try:
+        network_solver.compute_solutions(A, b, methods=(method,), verbose=False, cache=None,
+                                         monitor_options={'record': False})
+        traced = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return traced, rss_growth(baseline)
+
+
+def peak_memory(A, b, method):
+    #memory_task in a process of its own, since the resident-set peak never goes down
+    with multiprocessing.get_context('spawn').Pool(1) as pool:
+        return pool.apply(memory_task, (A, b, method))
+
+
+def benchmark(problems, sizes, storages, methods, warmup=1, repeats=3, max_seconds=30.0, memory=True,
+              log=print):
+    #run every (problem, size, storage, method) combination and return the records;
+    #memory adds one untimed run per combination in a fresh process
+    records = []
+    #a method that ran past max_seconds is not tried at larger sizes
+    exhausted = set()
+
+    for problem in problems:
+        for n in sizes:
+            A_sparse, b = PROBLEMS[problem](n)
+            for storage in storages:
+                if storage == 'dense' and A_sparse.shape[0] > DENSE_LIMIT:
+                    continue
+                A = A_sparse.toarray() if storage == 'dense' else A_sparse
+
+                for method in methods:
+                    if (problem, storage, method) in exhausted:
+                        continue
+                    if A.shape[0] > METHOD_LIMITS[method][storage]:
+                        continue
+
+                    #warmup runs are untimed; a slow one already rules out larger sizes
+                    #and ends the warmup
+                    run = ()
+                    for _ in range(warmup):
+                        run = run_method(A, b, method)
+                        if run is None:
+                            break
+                        if run[0] > max_seconds:
+                            exhausted.add((problem, storage, method))
+                            break
+                    if run is None:
+                        continue
+
+                    runs = []
+                    for _ in range(repeats):
+                        run = run_method(A, b, method)
+                        if run is None:
+                            break
+                        runs.append(run)
+                        if run[0] > max_seconds:
+                            exhausted.add((problem, storage, method))
+                            break
+                    if not runs:
+                        continue
+
+                    times = [run[0] for run in runs]
+                    traced, rss = peak_memory(A, b, method) if memory else (None, None)
+                    record = {
+                        'problem': problem,
+                        'n': int(A.shape[0]),
+                        'nnz': int(A_sparse.nnz),
+                        'storage': storage,
+                        'method': method,
+                        'repeats': len(runs),
+                        'time_min': min(times),
+                        'time_median': float(np.median(times)),
+                        'peak_memory_bytes': traced,
+                        'peak_rss_bytes': rss,
+                        'iterations': runs[-1][1],
+                        'residual': runs[-1][2],
+                    }
+                    records.append(record)
+                    memory_text = ""
+                    if traced is not None:
+                        memory_text = f"{traced / 2**20:9.2f} MB traced  "
+                    if rss is not None:
+                        memory_text += f"{rss / 2**20:9.2f} MB rss  "
+                    log(f"{problem:12s} n={record['n']:<8d} {storage:6s} {method:13s} "
+                        f"{record['time_median']:10.4f} s  {memory_text}"
+                        f"iters={record['iterations']}  residual={record['residual']:.2e}")
+    return records
+
+
+def environment():
+    #context needed to compare results across machines and versions
+    return {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'scipy': scipy.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def write_records(records, path):
+    #write results as JSON (with environment info) or CSV, chosen by file extension
+    if path.endswith('.csv'):
+        with open(path, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=list(records[0]) if records else [])
+            writer.writeheader()
+            writer.writerows(records)
+        return
+    with open(path, 'w') as f:
+        json.dump({'environment': environment(), 'results': records}, f, indent=2)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the network flow solvers across problem sizes.")
+    parser.add_argument('--problems', nargs='+', choices=list(PROBLEMS), default=list(PROBLEMS))
+    parser.add_argument('--sizes', nargs='+', type=int, default=list(SIZES))
+    parser.add_argument('--storage', nargs='+', choices=('dense', 'sparse'), default=['dense', 'sparse'])
+    parser.add_argument('--methods', nargs='+', choices=network_solver.METHODS + network_solver.PARALLEL_METHODS,
+                        default=list(network_solver.METHODS))
+    parser.add_argument('--warmup', type=int, default=1, help="untimed runs before the repeats")
+    parser.add_argument('--repeats', type=int, default=3, help="timed runs per configuration")
+    parser.add_argument('--max-seconds', type=float, default=30.0,
+                        help="skip larger sizes for a method once one run exceeds this")
+    parser.add_argument('--no-memory', dest='memory', action='store_false',
+                        help="skip the extra run per configuration that measures peak memory")
+    parser.add_argument('-o', '--output', default='benchmark_results.json', help=".json or .csv results file")
+    args = parser.parse_args(argv)
+
+    records = benchmark(args.problems, args.sizes, args.storage, args.methods,
+                        args.warmup, args.repeats, args.max_seconds, args.memory)
+    write_records(records, args.output)
+    print(f"Wrote {len(records)} results to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,202 @@
+"""Domain-decomposed block-Jacobi / additive-Schwarz solver across processes.
+
+The network graph is ordered by reverse Cuthill-McKee and cut into contiguous
+subdomains, one per worker process. Each worker factors its own diagonal block
+once. Every sweep it then solves
+
+    A_kk d_k = (b - A x)_k,    x_k += damping * d_k
+
+which is block Jacobi. With overlap > 0 the blocks are grown by that many
+layers of neighbours, and only the owned part of d is kept (restricted
+additive Schwarz).
+
+The iterates live in shared memory as two NumPy views, the old and the new x.
+Workers read boundary values straight from the old x and write their own rows
+of the new one, so nothing is copied or pickled per sweep. A barrier ends each
+sweep, and the parent checks convergence from per-worker partial norms.
+
+    x, history = block_jacobi_solve(A, b, parts=8, overlap=1)
+"""
+import multiprocessing
+import multiprocessing.connection
+import os
+import threading
+from multiprocessing import shared_memory
+
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse import csgraph
+
+import network_solver
+
+#below this many rows per subdomain the extra processes cost more than they save
+MIN_SUBDOMAIN_ROWS = 5000
+
+#block Jacobi has an eigenvalue -1 on Laplacians whose subdomains form a chain,
+#so updates are damped like weighted Jacobi
+DAMPING = 2 / 3
+
+#how often the parent's watchdog looks for workers that have exited, in seconds
+WATCH_INTERVAL = 0.1
+
+#time a worker gets to exit after the solve before it is terminated, in seconds
+JOIN_TIMEOUT = 5.0
+
+
+def partition(A, parts):
+    #(permutation, boundaries): RCM order cut into parts contiguous subdomains
+    pattern = abs(sp.csr_matrix(A))
+    order = csgraph.reverse_cuthill_mckee(sp.csr_matrix(pattern + pattern.T), symmetric_mode=True)
+    boundaries = np.linspace(0, A.shape[0], parts + 1).astype(int)
+    return order, boundaries
+
+
+def extended_rows(pattern, start, stop, overlap):
+    #owned rows start:stop plus overlap layers of graph neighbours, owned rows first
+    mask = np.zeros(pattern.shape[0], dtype=bool)
+    mask[start:stop] = True
+    for _ in range(overlap):
+        mask |= (pattern @ mask.astype(np.float64)) != 0
+    mask[start:stop] = False
+    return np.concatenate((np.arange(start, stop), np.flatnonzero(mask)))
+
+
+def shared_views(buffer, n, parts):
+    #iterates (2, n), per-worker partial norms (parts, 3) and the stop flag
+    X = np.ndarray((2, n), dtype=np.float64, buffer=buffer)
+    stats = np.ndarray((parts, 3), dtype=np.float64, buffer=buffer, offset=X.nbytes)
+    control = np.ndarray(1, dtype=np.float64, buffer=buffer, offset=X.nbytes + stats.nbytes)
+    return X, stats, control
+
+
+def subdomain_worker(worker, name, n, parts, start, stop, rows, A_rows, b_rows, damping, barrier, max_iter):
+    #one subdomain: factor its block once, then one restricted solve per sweep
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        X, stats, control = shared_views(shm.buf, n, parts)
+        owned = stop - start
+        factor = network_solver.sparse_lu_factor(A_rows[:, rows])
+        for i in range(max_iter):
+            x_old, x_new = X[i % 2], X[(i + 1) % 2]
+            r = b_rows - A_rows @ x_old
+            d = damping * network_solver.sparse_lu_factor_solve(factor, r)[:owned]
+            x_new[start:stop] = x_old[start:stop] + d
+            stats[worker] = d @ d, x_new[start:stop] @ x_new[start:stop], r[:owned] @ r[:owned]
+            barrier.wait()
+            #the parent decides whether to stop
+            barrier.wait()
+            if control[0]:
+                break
+    except threading.BrokenBarrierError:
+        pass
+    except BaseException:
+        barrier.abort()
+        raise
+    finally:
+        del X, stats, control
+        shm.close()
+
+
+def watch_workers(workers, barrier, done):
+    #a timed-out barrier.wait would break the barrier for every process, so the parent
+    #waits without a timeout and this thread aborts the barrier as soon as a worker
+    #exits before the solve is done
+    sentinels = [worker.sentinel for worker in workers]
+    while not done.is_set():
+        if multiprocessing.connection.wait(sentinels, WATCH_INTERVAL):
+            if not done.is_set():
+                barrier.abort()
+            return
+
+
+def worker_failure(workers):
+    #RuntimeError naming the workers that have exited and their exit codes
+    for worker in workers:
+        worker.join(WATCH_INTERVAL)
+    exited = [f"{k} (exit code {worker.exitcode})" for k, worker in enumerate(workers) if worker.exitcode is not None]
+    return RuntimeError("subdomain worker " + ", ".join(exited) + " failed" if exited else "a subdomain worker failed")
+
+
+def block_jacobi_solve(A, b, parts=None, overlap=0, damping=None, max_iter=1000, tol=1e-10,
+                       verbose=True, monitor=None, x0=None):
+    #solve with parallel block Jacobi (overlap=0) or restricted additive Schwarz;
+    #same stopping test, history and x0 semantics as jacobi_method; one subdomain
+    #is a direct solve and needs no damping
+    A = sp.csr_matrix(A, dtype=np.float64)
+    b = np.asarray(b, dtype=np.float64)
+    n = A.shape[0]
+    if parts is None:
+        parts = min(os.cpu_count() or 1, n // MIN_SUBDOMAIN_ROWS)
+    parts = int(min(max(parts, 1), n))
+    if damping is None:
+        damping = DAMPING if parts > 1 else 1.0
+
+    order, boundaries = partition(A, parts)
+    A = A[order][:, order]
+    b_order = b[order]
+    pattern = abs(A)
+    if monitor is None:
+        monitor = network_solver.ConvergenceMonitor()
+    monitor.start(max_iter, tol, b)
+
+    ctx = multiprocessing.get_context('spawn')
+    barrier = ctx.Barrier(parts + 1)
+    shm = shared_memory.SharedMemory(create=True, size=(2 * n + 3 * parts + 1) * 8)
+    X = stats = control = None
+    workers = []
+    done = threading.Event()
+    watchdog = threading.Thread(target=watch_workers, args=(workers, barrier, done), daemon=True)
+    try:
+        X, stats, control = shared_views(shm.buf, n, parts)
+        X[0] = 0.0 if x0 is None else np.asarray(x0, dtype=np.float64)[order]
+        control[0] = 0.0
+
+        for k in range(parts):
+            start, stop = boundaries[k], boundaries[k + 1]
+            rows = extended_rows(pattern, start, stop, overlap)
+            worker = ctx.Process(target=subdomain_worker, daemon=True,
+                                 args=(k, shm.name, n, parts, start, stop, rows, A[rows], b_order[rows],
+                                       damping, barrier, max_iter))
+            worker.start()
+            workers.append(worker)
+        watchdog.start()
+
+        for i in range(max_iter):
+            try:
+                barrier.wait()
+            except threading.BrokenBarrierError:
+                raise worker_failure(workers) from None
+            update, x_norm, r_norm = np.sqrt(stats.sum(axis=0))
+            if monitor.criterion == 'update':
+                error = np.float64(update) / x_norm
+            else:
+                error = r_norm / monitor.b_norm
+            stop = monitor.check_error(i, X[(i + 1) % 2], error) or i == max_iter - 1
+            control[0] = stop
+            if stop:
+                done.set()
+            try:
+                barrier.wait()
+            except threading.BrokenBarrierError:
+                raise worker_failure(workers) from None
+            if stop:
+                break
+
+        x = np.empty(n)
+        x[order] = X[monitor.iterations % 2]
+    finally:
+        done.set()
+        barrier.abort()
+        if watchdog.is_alive():
+            watchdog.join()
+        for worker in workers:
+            worker.join(JOIN_TIMEOUT)
+            if worker.is_alive():
+                worker.terminate()
+                worker.join()
+        del X, stats, control
+        shm.close()
+        shm.unlink()
+
+    network_solver.report(verbose, "Block-Jacobi", monitor)
+    return x, monitor.history
@@ -0,0 +1,107 @@
+"""LRU cache of matrix factorizations keyed by matrix content."""
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse import linalg as spla
+
+
+def matrix_key(A):
+    #content hash of a dense or sparse matrix
+    h = hashlib.blake2b(digest_size=16)
+    if sp.issparse(A):
+        A = sp.csr_matrix(A)
+        A.sum_duplicates()
+        A.sort_indices()
+        h.update(b'csr')
+        for arr in (A.data, A.indices, A.indptr):
+            h.update(np.ascontiguousarray(arr).tobytes())
+    else:
+        A = np.ascontiguousarray(A)
+        h.update(b'dense')
+        h.update(A.tobytes())
+    h.update(str((A.shape, A.dtype.str)).encode())
+    return h.hexdigest()
+
+
+def factor_nbytes(factor):
+    #approximate memory held by a factorization
+    if isinstance(factor, np.ndarray):
+        return factor.nbytes
+    if isinstance(factor, (tuple, list)):
+        return sum(factor_nbytes(f) for f in factor)
+    if isinstance(factor, spla.SuperLU):
+        #values plus row indices of L and U, and both permutations
+        return factor.nnz * 12 + 2 * factor.shape[0] * 4
+    return 0
+
+
+class FactorCache:
+    #holds SVD / LU / Cholesky factors of recently used matrices, evicting
+    #the least recently used ones once max_bytes is exceeded
+    def __init__(self, max_bytes=256 * 2**20):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def get(self, A, kind, compute, key=None):
+        #return the cached factor of A, computing and storing it on a miss
+        if key is None:
+            key = matrix_key(A)
+        with self.lock:
+            entry = self.entries.get((key, kind))
+            if entry is not None:
+                self.entries.move_to_end((key, kind))
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        factor = compute(A)
+        self.put(key, kind, factor)
+        return factor
+
+    def peek(self, key, kind):
+        #the cached factor, or None; never computes one
+        with self.lock:
+            entry = self.entries.get((key, kind))
+            if entry is None:
+                return None
+            self.entries.move_to_end((key, kind))
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, kind, factor):
+        #store a factor, evicting least recently used entries to stay under the cap
+        size = factor_nbytes(factor)
+        if size > self.max_bytes:
+            return
+        with self.lock:
+            if (key, kind) in self.entries:
+                return
+            self.entries[(key, kind)] = (factor, size)
+            self.nbytes += size
+            while self.nbytes > self.max_bytes:
+                _, (_, old_size) = self.entries.popitem(last=False)
+                self.nbytes -= old_size
+                self.evictions += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.nbytes = 0
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'entries': len(self.entries),
+            'nbytes': self.nbytes,
+            'max_bytes': self.max_bytes,
+        }
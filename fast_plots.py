@@ -0,0 +1,136 @@
+"""Matplotlib artists that draw large series at screen resolution.
+
+Each series is reduced once to a min/max pyramid. On every zoom, pan or resize
+the artist picks the level whose bins are about one pixel wide and draws just
+that slice, so redraw time depends on the axes width rather than the data size.
+"""
+from abc import ABC, abstractmethod
+
+import numpy as np
+from matplotlib.collections import LineCollection
+
+#series shorter than this are drawn the classic way
+FAST_PLOT_MIN_POINTS = 2000
+
+
+class MinMaxPyramid:
+    #level k holds the min and max of consecutive blocks of 2**k samples
+    def __init__(self, x, y):
+        self.x = np.asarray(x, dtype=np.float64)
+        self.y = np.asarray(y, dtype=np.float64)
+        self.levels = [(self.x, self.y, self.y)]
+        x, lo, hi = self.levels[0]
+        while len(lo) > 1:
+            if len(lo) % 2:
+                lo, hi = np.append(lo, lo[-1]), np.append(hi, hi[-1])
+            x = x[::2]
+            lo = np.minimum(lo[0::2], lo[1::2])
+            hi = np.maximum(hi[0::2], hi[1::2])
+            self.levels.append((x, lo, hi))
+
+    def query(self, x0, x1, pixels):
+        #(level, x, lo, hi) covering [x0, x1] with at most about 2 * pixels bins
+        i0 = max(np.searchsorted(self.x, x0) - 1, 0)
+        i1 = min(np.searchsorted(self.x, x1, side='right') + 1, len(self.x))
+        pixels = max(int(pixels), 1)
+        level = 0
+        if i1 - i0 > 2 * pixels:
+            level = min(int(np.log2((i1 - i0) / pixels)), len(self.levels) - 1)
+        x, lo, hi = self.levels[level]
+        j0, j1 = i0 >> level, ((i1 - 1) >> level) + 1
+        return level, x[j0:j1], lo[j0:j1], hi[j0:j1]
+
+
+class DecimatedArtist(ABC):
+    #re-decimates whenever the x-limits or the canvas size change
+    def __init__(self, ax):
+        self.ax = ax
+        ax.callbacks.connect('xlim_changed', lambda ax: self.update())
+        ax.figure.canvas.mpl_connect('resize_event', lambda event: self.update())
+
+    def view(self):
+        x0, x1 = self.ax.get_xlim()
+        return min(x0, x1), max(x0, x1), self.ax.bbox.width
+
+    @abstractmethod
+    def update(self):
+        #redraw for the current view()
+        pass
+
+
+class DecimatedLine(DecimatedArtist):
+    #line (or marker series) that draws the min/max envelope of each pixel column
+    def __init__(self, ax, x, y, *args, **kwargs):
+        super().__init__(ax)
+        self.pyramid = MinMaxPyramid(x, y)
+        self.line, = ax.plot([], [], *args, **kwargs)
+        x0, x1 = self.pyramid.x[0], self.pyramid.x[-1]
+        _, lo, hi = self.pyramid.levels[-1]
+        ax.update_datalim([[x0, lo[0]], [x1, hi[0]]])
+        ax.autoscale_view()
+        self.draw_range(x0, x1, ax.bbox.width)
+
+    def update(self):
+        self.draw_range(*self.view())
+
+    def draw_range(self, x0, x1, pixels):
+        level, x, lo, hi = self.pyramid.query(x0, x1, pixels)
+        if level == 0:
+            self.line.set_data(x, lo)
+        else:
+            self.line.set_data(np.repeat(x, 2), np.column_stack((lo, hi)).ravel())
+
+
+class DecimatedBars(DecimatedArtist):
+    #bar chart drawn as one LineCollection of vertical segments from 0 to each value;
+    #when bars are narrower than a pixel each segment spans the min/max of its bin
+    def __init__(self, ax, x, heights, offset=0.0, width=0.8, **kwargs):
+        super().__init__(ax)
+        self.pyramid = MinMaxPyramid(x, heights)
+        self.offset = offset
+        self.width = width
+        self.collection = LineCollection([], capstyle='butt', **kwargs)
+        ax.add_collection(self.collection, autolim=False)
+        _, lo, hi = self.pyramid.levels[-1]
+        x0, x1 = self.pyramid.x[0], self.pyramid.x[-1]
+        ax.update_datalim([[x0 - 0.5, min(lo[0], 0)], [x1 + 0.5, max(hi[0], 0)]])
+        ax.autoscale_view()
+        self.draw_range(x0 - 0.5, x1 + 0.5, ax.bbox.width)
+
+    def update(self):
+        self.draw_range(*self.view())
+
+    def draw_range(self, x0, x1, pixels):
+        level, x, lo, hi = self.pyramid.query(x0, x1, pixels)
+        step = 2 ** level
+        centre = x + self.offset + (step - 1) / 2
+        bottom, top = (np.minimum(lo, 0), np.maximum(hi, 0)) if level else (np.zeros_like(lo), lo)
+        self.collection.set_segments(np.stack((np.column_stack((centre, bottom)),
+                                               np.column_stack((centre, top))), axis=1))
+        #line widths are in points, so convert the bar width from data units
+        px_per_unit = pixels / max(x1 - x0, 1e-300)
+        width = (self.width if level == 0 else step) * px_per_unit
+        self.collection.set_linewidth(max(width, 1.0) * 72 / self.ax.figure.dpi)
+
+
+class ResampledCurve(DecimatedArtist):
+    #smooth function re-evaluated at one point per pixel of the visible part of its domain
+    def __init__(self, ax, func, x0, x1, *args, **kwargs):
+        super().__init__(ax)
+        self.func = func
+        self.domain = (x0, x1)
+        self.line, = ax.plot([], [], *args, **kwargs)
+        self.draw_range(x0, x1, ax.bbox.width)
+        ax.update_datalim(np.column_stack(self.line.get_data()))
+        ax.autoscale_view()
+
+    def update(self):
+        self.draw_range(*self.view())
+
+    def draw_range(self, x0, x1, pixels):
+        x0, x1 = max(x0, self.domain[0]), min(x1, self.domain[1])
+        if x1 <= x0:
+            self.line.set_data([], [])
+            return
+        x = np.linspace(x0, x1, max(int(pixels), 2))
+        self.line.set_data(x, self.func(x))
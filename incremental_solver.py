@@ -0,0 +1,239 @@
+"""Incremental re-solves of a network after small edits to A or b.
+
+IncrementalSolver keeps the factorization of a base matrix A0 and records
+every later change as a low-rank term, A = A0 + U V^T. The direct methods then
+solve through the Sherman-Morrison-Woodbury identity
+
+    A^-1 = G - G U (I + V^T G U)^-1 V^T G,   G = A0^-1,
+
+which costs one back-substitution per edit instead of a new factorization.
+The identity also holds for the grounded inverse used on singular Laplacians.
+The iterative methods warm-start from the previous solution.
+
+    solver = IncrementalSolver(A, b)
+    solver.update_edge(2, 3, +0.5)     #road 2-3 gains capacity
+    solver.set_demand(0, 12.0)         #node 0 now supplies 12 units
+    solutions = solver.solve()
+"""
+import time
+
+import numpy as np
+import scipy.sparse as sp
+
+import laplacian_solver
+import network_solver
+from factor_cache import matrix_key
+
+#refactor once this many rank-1 edits have accumulated
+MAX_UPDATE_RANK = 32
+
+#pre-check results of the iterative methods, carried over from the first solve
+PRECHECK_KEYS = ('spectral_radius', 'spectral_radius_converged', 'predicted_iterations')
+
+#relative residual above which an SMW solution is replaced by a fresh factorization
+REFACTOR_TOL = 1e-8
+
+
+class IncrementalSolver:
+    #network A x = b that is edited one edge or demand at a time and re-solved cheaply
+    def __init__(self, A, b, methods=network_solver.METHODS, cache=network_solver.default_cache,
+                 monitor_options=None, max_rank=MAX_UPDATE_RANK, verbose=False):
+        self.A = sp.csr_matrix(A, dtype=np.float64) if sp.issparse(A) else np.array(A, dtype=np.float64)
+        self.b = np.array(b, dtype=np.float64)
+        self.methods = network_solver.applicable_methods(self.A, methods)
+        self.cache = cache
+        self.monitor_options = monitor_options or {}
+        self.max_rank = max_rank
+        self.verbose = verbose
+        self.refactorizations = 0
+
+        self.solutions = network_solver.compute_solutions(self.A, self.b, self.methods, verbose=verbose,
+                                                          cache=cache, monitor_options=monitor_options)
+        self.omega = self.solutions['SOR']['omega'] if 'SOR' in self.solutions else None
+        self.amg = None
+        self.rebase()
+
+    def rebase(self):
+        #make the current matrix the factored base A0 and drop the low-rank terms
+        self.base = self.A.copy()
+        self.factor = network_solver.direct_factor(self.base, self.cache,
+                                                   matrix_key(self.base) if self.cache is not None else None)
+        n = self.A.shape[0]
+        self.U = np.zeros((n, 0))
+        self.V = np.zeros((n, 0))
+        self.GU = np.zeros((n, 0))
+        self.amg = None
+        self.null_vector, self.null_checked = None, False
+        self.laplacian = laplacian_solver.is_laplacian(self.A) if 'Laplacian' in self.methods else False
+
+    @property
+    def rank(self):
+        return self.U.shape[1]
+
+    def update_matrix(self, U, V):
+        #A += U V^T for (n, k) blocks U and V
+        U = np.asarray(U, dtype=np.float64).reshape(self.A.shape[0], -1)
+        V = np.asarray(V, dtype=np.float64).reshape(self.A.shape[0], -1)
+        if sp.issparse(self.A):
+            self.A = sp.csr_matrix(self.A + sp.csr_matrix(U) @ sp.csr_matrix(V).T)
+        else:
+            self.A += U @ V.T
+        self.null_vector, self.null_checked = None, False
+        if 'Laplacian' in self.methods:
+            self.laplacian = laplacian_solver.is_laplacian(self.A)
+
+        if self.rank + U.shape[1] > self.max_rank:
+            self.rebase()
+            self.refactorizations += 1
+            return
+        self.U = np.hstack((self.U, U))
+        self.V = np.hstack((self.V, V))
+        #one back-substitution per new column; older columns of G U are kept
+        self.GU = np.hstack((self.GU, network_solver.direct_factor_solve(self.factor, U)))
+
+    def update_edge(self, i, j, delta):
+        #change the weight (capacity) of edge i-j by delta: A += delta (e_i - e_j)(e_i - e_j)^T
+        u = np.zeros(self.A.shape[0])
+        u[i], u[j] = 1.0, -1.0
+        self.update_matrix(delta * u, u)
+
+    def update_entry(self, i, j, delta):
+        #change a single matrix entry: A[i, j] += delta
+        u, v = np.zeros(self.A.shape[0]), np.zeros(self.A.shape[0])
+        u[i], v[j] = delta, 1.0
+        self.update_matrix(u, v)
+
+    def set_demand(self, i, value):
+        self.b[i] = value
+
+    def update_demands(self, b):
+        self.b = np.array(b, dtype=np.float64)
+
+    def woodbury_solve(self, b):
+        #x = A^-1 b from the base factors and the accumulated low-rank terms
+        x = network_solver.direct_factor_solve(self.factor, b)
+        if self.rank == 0:
+            return x
+        capacitance = np.eye(self.rank) + self.V.T @ self.GU
+        return x - self.GU @ np.linalg.solve(capacitance, self.V.T @ x)
+
+    def solve(self):
+        #re-solve the edited system; returns the same per-method dict as compute_solutions
+        solutions = {}
+        direct = [m for m in ('SVD', 'Gauss') if m in self.methods]
+        if direct:
+            solutions.update(self.solve_direct(direct))
+
+        previous = self.solutions
+        for method in ('Jacobi', 'Gauss-Seidel', 'SOR'):
+            if method not in self.methods:
+                continue
+            t0 = time.time()
+            monitor = network_solver.ConvergenceMonitor(**self.monitor_options)
+            x0 = previous.get(method, {}).get('solution')
+            if method == 'Jacobi':
+                x, history = network_solver.jacobi_method(self.A, self.b, verbose=self.verbose,
+                                                          monitor=monitor, x0=x0)
+            else:
+                #the relaxation factor of the original matrix is kept for small edits
+                omega = 1.0 if method == 'Gauss-Seidel' else self.omega
+                x, history = network_solver.sor_method(self.A, self.b, omega=omega, verbose=self.verbose,
+                                                       name=method, monitor=monitor, x0=x0)
+            solutions[method] = {
+                'solution': x,
+                'history': history,
+                'history_iterations': monitor.history_iterations,
+                'iterations': monitor.iterations,
+                'status': monitor.status,
+                **self.precheck(method, previous),
+                'projected_iterations': monitor.projected_iterations,
+                'time': time.time() - t0
+            }
+            if method == 'SOR':
+                solutions[method]['omega'] = omega
+                solutions[method]['kernel'] = previous.get('SOR', {}).get('kernel', "SOR")
+
+        if 'Laplacian' in self.methods and self.laplacian:
+            t0 = time.time()
+            #the multigrid hierarchy of the base matrix stays a good preconditioner
+            if self.amg is None:
+                self.amg = laplacian_solver.AMGPreconditioner(self.base)
+            result = laplacian_solver.laplacian_solve(self.A, self.b, preconditioner=self.amg, project=True,
+                                                      x0=previous.get('Laplacian', {}).get('solution'))
+            solutions['Laplacian'] = {
+                'solution': result['solution'],
+                'history': result['history'],
+                'iterations': len(result['history']),
+                'imbalance': result['imbalance'],
+                'time': time.time() - t0
+            }
+
+        for method in solutions:
+            solutions[method]['residual'] = np.linalg.norm(self.A @ solutions[method]['solution'] - self.b)
+        self.solutions = solutions
+        return solutions
+
+    def precheck(self, method, previous):
+        #like omega, the spectral radius of the original matrix is kept for small edits;
+        #it is only estimated here if the first solve has none for this method
+        if all(key in previous.get(method, {}) for key in PRECHECK_KEYS):
+            return {key: previous[method][key] for key in PRECHECK_KEYS}
+        omega = None if method == 'Jacobi' else 1.0 if method == 'Gauss-Seidel' else self.omega
+        rho, converged = network_solver.iteration_spectral_radius(self.A, omega)
+        return {'spectral_radius': rho, 'spectral_radius_converged': converged,
+                'predicted_iterations': network_solver.predicted_iterations(rho) if converged else None}
+
+    def solve_direct(self, methods):
+        #Gauss (and SVD) solutions through Woodbury, refactoring if that loses accuracy
+        t0 = time.time()
+        x = self.woodbury_solve(self.b)
+        consistent = self.solves(x)
+        if not consistent and self.rank > 0:
+            #near-singular capacitance matrix, or an edit that changed the nullspace
+            self.rebase()
+            self.refactorizations += 1
+            x = network_solver.direct_factor_solve(self.factor, self.b)
+            consistent = self.solves(x)
+        elapsed = time.time() - t0
+
+        solutions = {}
+        if 'Gauss' in methods:
+            solutions['Gauss'] = {'solution': x, 'time': elapsed, 'update_rank': self.rank}
+        if 'SVD' in methods:
+            t0 = time.time()
+            if consistent:
+                svd_solution = self.min_norm(x)
+            else:
+                #no exact solution: the least-squares answer needs the full SVD / LSQR path
+                svd_solution = network_solver.compute_solutions(self.A, self.b, ('SVD',), verbose=False,
+                                                                cache=self.cache)['SVD']['solution']
+            solutions['SVD'] = {'solution': svd_solution, 'time': elapsed + time.time() - t0,
+                                'update_rank': self.rank}
+        return solutions
+
+    def solves(self, x):
+        #whether x solves the current system to REFACTOR_TOL
+        scale = max(np.linalg.norm(self.b), 1.0)
+        return bool(np.all(np.isfinite(x)) and np.linalg.norm(self.A @ x - self.b) <= REFACTOR_TOL * scale)
+
+    def min_norm(self, x):
+        #minimum-norm solution from the grounded one: remove its component along the
+        #null vector z = e_n - A^-1 A e_n (zero when A is nonsingular)
+        if not self.null_checked:
+            self.null_vector, self.null_checked = self.find_null_vector(), True
+        z = self.null_vector
+        if z is None:
+            return x
+        return x - z * (z @ x) / (z @ z)
+
+    def find_null_vector(self):
+        #computed once per matrix edit, so demand-only updates skip the extra solve
+        n = self.A.shape[0]
+        last = self.A[:, [n - 1]]
+        last = last.toarray().ravel() if sp.issparse(last) else np.ravel(last)
+        z = -self.woodbury_solve(last)
+        z[-1] += 1.0
+        z_norm = np.linalg.norm(z)
+        if z_norm < 1e-12 or np.linalg.norm(self.A @ z) > 1e-8 * z_norm * max(np.abs(last).max(), 1.0):
+            return None
+        return z
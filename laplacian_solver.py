@@ -0,0 +1,189 @@
+"""Graph-Laplacian solver for flow networks: nullspace handling, PCG and AMG."""
+import numpy as np
+import scipy.sparse as sp
+from scipy import linalg
+from scipy.sparse import csgraph
+
+
+def is_laplacian(A, tol=1e-10):
+    #symmetric, non-positive off-diagonals and zero row sums
+    A = sp.csr_matrix(A)
+    scale = max(abs(A).max(), 1.0)
+    if A.nnz and abs(A - A.T).max() > tol * scale:
+        return False
+    off = A - sp.diags(A.diagonal())
+    if off.nnz and off.max() > tol * scale:
+        return False
+    return bool(np.all(np.abs(np.asarray(A.sum(axis=1)).ravel()) <= tol * scale))
+
+
+def components(A):
+    #connected component label of every node; each one adds a constant nullspace vector
+    return csgraph.connected_components(sp.csr_matrix(A), directed=False)[1]
+
+
+def has_bipartite_component(A):
+    #whether a component with at least one edge is bipartite, which gives the Jacobi
+    #iteration matrix D^-1 W an eigenvalue -1; such a component splits in two in the
+    #bipartite double cover of the graph, every other component stays connected
+    W = sp.csr_matrix(A - sp.diags(A.diagonal()))
+    W.eliminate_zeros()
+    isolated = np.diff(W.indptr) == 0
+    cover = sp.bmat([[None, W], [W, None]], format='csr')
+    single = csgraph.connected_components(sp.csr_matrix(A), directed=False)[0]
+    double = csgraph.connected_components(cover, directed=False)[0]
+    #an isolated node splits in two without being bipartite
+    return double - int(isolated.sum()) > single
+
+
+def check_consistency(b, labels):
+    #relative net demand per component; b is only in the range of A when every one is ~0
+    net = np.bincount(labels, weights=b)
+    gross = np.bincount(labels, weights=np.abs(b))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        imbalance = np.where(gross > 0, np.abs(net) / gross, 0.0)
+    return imbalance.max() if imbalance.size else 0.0
+
+
+def remove_component_means(v, labels, counts):
+    #project out the constant vector of each component
+    return v - (np.bincount(labels, weights=v) / counts)[labels]
+
+
+def apply_gauge(x, labels, counts, gauge='ground'):
+    #fix the free constant of each component: ground its last node or zero its mean
+    if gauge == 'mean':
+        return remove_component_means(x, labels, counts)
+    ground = np.zeros(len(counts), dtype=int)
+    np.maximum.at(ground, labels, np.arange(len(x)))
+    return x - x[ground][labels]
+
+
+def laplacian_solve(A, b, gauge='ground', preconditioner='amg', tol=1e-10, max_iter=1000,
+                    project=False, x0=None):
+    #solve the singular Laplacian system A x = b with preconditioned conjugate gradient;
+    #preconditioner is 'amg', 'jacobi' or a prebuilt AMGPreconditioner (e.g. of a
+    #slightly different matrix), and x0 warm-starts the iteration
+    A = sp.csr_matrix(A, dtype=np.float64)
+    b = np.asarray(b, dtype=np.float64)
+    labels = components(A)
+    counts = np.bincount(labels)
+
+    imbalance = check_consistency(b, labels)
+    if imbalance > 1e-8:
+        if not project:
+            raise ValueError(f"demand vector is inconsistent: net demand per component is off by {imbalance:.2e}")
+        #least-squares answer: drop the part of b outside the range of A
+        b = remove_component_means(b, labels, counts)
+
+    if isinstance(preconditioner, AMGPreconditioner):
+        M = preconditioner.apply
+    elif preconditioner == 'amg':
+        M = AMGPreconditioner(A).apply
+    else:
+        D = A.diagonal()
+        D = np.where(D != 0, D, 1.0)
+        M = lambda r: r / D
+    precondition = lambda r: remove_component_means(M(r), labels, counts)
+
+    x, history = pcg(A, b, precondition, tol, max_iter, x0)
+    return {
+        'solution': apply_gauge(x, labels, counts, gauge),
+        'history': history,
+        'imbalance': imbalance,
+        'components': len(counts),
+    }
+
+
+def pcg(A, b, precondition, tol=1e-10, max_iter=1000, x0=None):
+    #preconditioned conjugate gradient; history holds the relative residual per iteration
+    x = np.zeros_like(b) if x0 is None else np.array(x0, dtype=np.float64)
+    b_norm = np.linalg.norm(b)
+    history = []
+    if b_norm == 0:
+        return np.zeros_like(b), history
+
+    r = b - A @ x if x0 is not None else b.copy()
+    if np.linalg.norm(r) / b_norm < tol:
+        return x, history
+    z = precondition(r)
+    p = z.copy()
+    rz = r @ z
+    for i in range(max_iter):
+        Ap = A @ p
+        alpha = rz / (p @ Ap)
+        x += alpha * p
+        r -= alpha * Ap
+
+        error = np.linalg.norm(r) / b_norm
+        history.append(error)
+        if error < tol:
+            break
+
+        z = precondition(r)
+        rz_new = r @ z
+        p = z + (rz_new / rz) * p
+        rz = rz_new
+
+    return x, history
+
+
+def aggregate(A):
+    #group nodes around a maximal independent set of the matrix graph (vectorized Luby)
+    n = A.shape[0]
+    graph = sp.csr_matrix(A - sp.diags(A.diagonal()))
+    graph.eliminate_zeros()
+    graph.data[:] = 1.0
+    weight = 1.0 + np.random.default_rng(0).random(n)
+
+    undecided = np.ones(n, dtype=bool)
+    root = np.zeros(n, dtype=bool)
+    while undecided.any():
+        #largest weight among each node's still undecided neighbours
+        neighbour_max = (graph @ sp.diags(np.where(undecided, weight, 0.0))).max(axis=1)
+        neighbour_max = neighbour_max.toarray().ravel()
+        new_roots = undecided & (weight > neighbour_max)
+        root |= new_roots
+        undecided &= ~new_roots
+        undecided &= ~((graph @ new_roots.astype(np.float64)) > 0)
+
+    #every other node joins its heaviest neighbouring root
+    root_id = np.cumsum(root) - 1
+    nearest = (graph @ sp.diags(np.where(root, weight, 0.0))).tocsr().argmax(axis=1)
+    nearest = np.asarray(nearest).ravel()
+    return np.where(root, root_id, root_id[nearest]), int(root.sum())
+
+
+class AMGPreconditioner:
+    #smoothed-aggregation algebraic multigrid V-cycle for graph Laplacians
+    def __init__(self, A, max_coarse=500, max_levels=10, omega=2/3):
+        self.omega = omega
+        self.levels = []
+        A = sp.csr_matrix(A)
+        while A.shape[0] > max_coarse and len(self.levels) < max_levels - 1:
+            agg, n_agg = aggregate(A)
+            if n_agg >= A.shape[0]:
+                break
+            D_inv = 1.0 / np.where(A.diagonal() != 0, A.diagonal(), 1.0)
+            #tentative prolongator carries the constant vector, then one Jacobi smoothing step
+            T = sp.csr_matrix((np.ones(A.shape[0]), (np.arange(A.shape[0]), agg)),
+                              shape=(A.shape[0], n_agg))
+            P = sp.csr_matrix(T - omega * (sp.diags(D_inv) @ (A @ T)))
+            self.levels.append((A, D_inv, P))
+            A = sp.csr_matrix(P.T @ A @ P)
+        #coarsest level is singular for a Laplacian, so use its pseudo-inverse
+        self.coarse_pinv = linalg.pinvh(A.toarray()) if A.shape[0] else np.zeros((0, 0))
+
+    def apply(self, r):
+        return self.cycle(0, r)
+
+    def cycle(self, level, r):
+        if level == len(self.levels):
+            return self.coarse_pinv @ r
+        A, D_inv, P = self.levels[level]
+        x = self.omega * D_inv * r
+        x += self.omega * D_inv * (r - A @ x)
+        x += P @ self.cycle(level + 1, P.T @ (r - A @ x))
+        x += self.omega * D_inv * (r - A @ x)
+        x += self.omega * D_inv * (r - A @ x)
+        return x
@@ -1,7 +1,8 @@
+import os
 import sys
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout,
                            QPushButton, QLabel, QStackedWidget, QHBoxLayout,
-                           QGroupBox)
+                           QGroupBox, QFileDialog, QMessageBox)
 from PyQt5.QtCore import Qt
 from PyQt5.QtGui import QFont, QPixmap
 import matplotlib
@@ -65,8 +66,13 @@ class NumericalMethodsApp(QMainWindow):
         
         network_btn = QPushButton("Solve Network Flow")
         network_btn.setMinimumHeight(40)
-        network_btn.clicked.connect(self.open_network_flow)
+        network_btn.clicked.connect(lambda: self.open_network_flow())
         network_layout.addWidget(network_btn)
+        
+        load_btn = QPushButton("Load Network File...")
+        load_btn.setMinimumHeight(40)
+        load_btn.clicked.connect(self.load_network_file)
+        network_layout.addWidget(load_btn)
         network_layout.addStretch()
         
         problems_layout.addWidget(network_group)
@@ -104,9 +110,29 @@ class NumericalMethodsApp(QMainWindow):
         footer_layout.addWidget(exit_btn)
         main_layout.addLayout(footer_layout)
     
-    def open_network_flow(self):
+    def load_network_file(self):
+        #pick an edge list / Matrix Market / NumPy network and, if it has no demands, a demand file
+        network_path, _ = QFileDialog.getOpenFileName(
+            self, "Open Network", "", "Networks (*.csv *.txt *.edges *.mtx *.npy *.npz);;All Files (*)")
+        if not network_path:
+            return
+        demand_path = None
+        if not network_path.endswith('.npz'):
+            demand_path, _ = QFileDialog.getOpenFileName(
+                self, "Open Node Demands", os.path.dirname(network_path), "Demands (*.csv *.txt);;All Files (*)")
+            if not demand_path:
+                return
+        try:
+            self.open_network_flow(network_path, demand_path)
+        except Exception as e:
+            QMessageBox.warning(self, "Could not load network", str(e))
+    
+    def open_network_flow(self, network_path=None, demand_path=None):
         from network_flow_gui import NetworkFlowGUI
         
+        #load (and validate) the network before any window is opened
+        self.network_flow_widget = NetworkFlowGUI(network_path=network_path, demand_path=demand_path)
+        
         #create a new window for the network flow analysis
         self.network_flow_window = QMainWindow()
         self.network_flow_window.setWindowTitle("Problem A5: Transportation Network Flow Analysis")
@@ -117,8 +143,7 @@ class NumericalMethodsApp(QMainWindow):
         self.network_flow_window.setCentralWidget(central_widget)
         layout = QVBoxLayout(central_widget)
         
-        #create the network flow GUI
-        self.network_flow_widget = NetworkFlowGUI()
+        #add the network flow GUI
         layout.addWidget(self.network_flow_widget)
         
         #add a back button
@@ -0,0 +1,202 @@
+"""Structure analysis of network matrices and dispatch to specialized direct solvers.
+
+analyze_structure finds the bandwidth, symmetry, diagonal dominance and
+positive (semi)definiteness of A. structured_factor then picks the cheapest
+kernel that is still correct for that structure:
+
+- tridiagonal SPD: LAPACK pttrf/pttrs (symmetric Thomas algorithm, O(n))
+- tridiagonal: LAPACK gttrf/gttrs (Thomas with partial pivoting, O(n))
+- banded SPD: banded Cholesky, O(n w^2)
+- banded: banded LU with partial pivoting, O(n w^2)
+- dense SPD: Cholesky
+
+Anything else is left to SuperLU (sparse) or the general Gauss elimination.
+
+A connected graph Laplacian is singular, so its last node is grounded first.
+The grounded matrix is SPD, which also lets the SVD method get the
+minimum-norm solution from the same factor.
+"""
+import numpy as np
+import scipy.sparse as sp
+from scipy import linalg
+from scipy.sparse import csgraph
+
+import laplacian_solver
+
+#widest band (lower + upper + 1 diagonals) still solved with the banded kernels
+BANDED_MAX_WIDTH = 65
+
+
+def analyze_structure(A, tol=1e-12):
+    #bandwidth, symmetry, diagonal dominance and definiteness of A, all in O(nnz)
+    n = A.shape[0]
+    if sp.issparse(A):
+        M = sp.coo_matrix(A)
+        rows, cols, vals = M.row, M.col, M.data
+        keep = vals != 0
+        rows, cols, vals = rows[keep], cols[keep], vals[keep]
+        scale = max(np.abs(vals).max(), 1.0) if len(vals) else 1.0
+        symmetric = not len(vals) or abs(sp.csr_matrix(A) - sp.csr_matrix(A).T).max() <= tol * scale
+    else:
+        rows, cols = np.nonzero(A)
+        vals = A[rows, cols]
+        scale = max(np.abs(vals).max(), 1.0) if len(vals) else 1.0
+        symmetric = np.allclose(A, A.T, rtol=0, atol=tol * scale)
+
+    lower = int(np.max(rows - cols, initial=0))
+    upper = int(np.max(cols - rows, initial=0))
+    diag = np.asarray(A.diagonal(), dtype=np.float64)
+    off = np.bincount(rows, weights=np.where(rows != cols, np.abs(vals), 0.0), minlength=n)
+    margin = np.abs(diag) - off
+    dominant = bool(np.all(margin >= -tol * scale))
+    strict_rows = margin > tol * scale
+
+    #definiteness from Gershgorin / Taussky: a symmetric, weakly diagonally dominant
+    #matrix with a positive diagonal is PSD, and PD when every irreducible block
+    #(connected component of its graph) has a strictly dominant row
+    semidefinite = bool(symmetric and dominant and np.all(diag >= 0))
+    definite = False
+    if semidefinite and np.all(diag > 0):
+        graph = sp.coo_matrix((np.ones(len(rows)), (rows, cols)), shape=(n, n))
+        labels = csgraph.connected_components(graph, directed=False)[1]
+        definite = bool(np.all(np.bincount(labels, weights=strict_rows) > 0))
+
+    return {
+        'n': n,
+        'lower': lower,
+        'upper': upper,
+        'symmetric': bool(symmetric),
+        'diagonally_dominant': dominant,
+        'strictly_dominant': bool(np.all(strict_rows)),
+        'semidefinite': semidefinite,
+        'positive_definite': definite,
+        'laplacian': semidefinite and not definite and laplacian_solver.is_laplacian(A),
+    }
+
+
+def structured_factor(A, structure=None):
+    #(kernel, factor, grounded, structure) for a specialized kernel, or None when A
+    #is left to the general sparse LU / Gauss elimination
+    structure = structure or analyze_structure(A)
+    S, grounded = grounded_block(A, structure)
+    if structure['laplacian'] and not grounded:
+        #several components: leave the singular matrix to the general elimination
+        return None
+    if grounded:
+        structure = dict(structure, positive_definite=True)
+
+    lower, upper = structure['lower'], structure['upper']
+    #Gershgorin only proves definiteness for dominant matrices; any other symmetric
+    #matrix with a positive diagonal may still be SPD, which Cholesky itself decides
+    definite = structure['positive_definite']
+    candidate = definite or (structure['symmetric'] and bool(np.all(S.diagonal() > 0)))
+    spd = dict(structure, positive_definite=True)
+    n = S.shape[0]
+    #a band covering most of a small matrix gains nothing over the dense kernels
+    if n > 2 and (lower + upper <= 2 or lower + upper + 1 <= min(BANDED_MAX_WIDTH, n // 2)):
+        if lower <= 1 and upper <= 1:
+            if candidate:
+                d, e, info = linalg.lapack.dpttrf(S.diagonal().astype(np.float64),
+                                                  S.diagonal(1).astype(np.float64))
+                if info == 0:
+                    return 'tridiagonal SPD (LAPACK pttrf)', (d, e), grounded, spd
+            dl, d, du, du2, ipiv, info = linalg.lapack.dgttrf(
+                S.diagonal(-1).astype(np.float64), S.diagonal().astype(np.float64),
+                S.diagonal(1).astype(np.float64))
+            if info == 0 and nonsingular(d):
+                return 'tridiagonal (LAPACK gttrf)', (dl, d, du, du2, ipiv), grounded, structure
+            return None
+        if candidate:
+            try:
+                cb = linalg.cholesky_banded(band_storage(S, 0, upper), lower=False)
+                return 'banded Cholesky', (cb,), grounded, spd
+            except linalg.LinAlgError:
+                pass
+        ab = band_storage(S, lower, upper)
+        lu = linalg.lapack.dgbtrf(np.vstack((np.zeros((lower, S.shape[0])), ab)), lower, upper)
+        if lu[2] == 0 and nonsingular(lu[0][lower + upper]):
+            return 'banded LU', ((lower, upper), lu[0], lu[1]), grounded, structure
+    elif candidate and not sp.issparse(S):
+        try:
+            return 'Cholesky', linalg.cho_factor(S), grounded, spd
+        except linalg.LinAlgError:
+            pass
+    return None
+
+
+def grounded_block(A, structure):
+    #(matrix to factor, grounded): a connected Laplacian loses its last row and
+    #column, which leaves an SPD block; only connected Laplacians have the single
+    #constant null vector that grounding removes
+    if structure['laplacian'] and structure['n'] > 1 and laplacian_solver.components(A).max() == 0:
+        return A[:-1, :-1], True
+    return A, False
+
+
+def nonsingular(pivots):
+    #no zero (or rounding-level) pivot in the U factor; shared with the SuperLU factor
+    #of the sparse solvers, where a singular Laplacian often ends in a tiny pivot
+    #instead of failing
+    pivots = np.abs(pivots)
+    return pivots.min() > len(pivots) * np.finfo(np.float64).eps * pivots.max()
+
+
+def band_storage(A, lower, upper):
+    #LAPACK band layout: row upper + i - j holds A[i, j]
+    n = A.shape[0]
+    ab = np.zeros((lower + upper + 1, n))
+    for k in range(-lower, upper + 1):
+        diagonal = A.diagonal(k)
+        if k >= 0:
+            ab[upper - k, k:] = diagonal
+        else:
+            ab[upper - k, :n + k] = diagonal
+    return ab
+
+
+def structured_factor_solve(factor, b):
+    #solve with a structured_factor for a vector or an (n, k) block
+    kernel, data, grounded, _ = factor
+    b = np.asarray(b, dtype=np.float64)
+    if grounded:
+        x = np.zeros(b.shape)
+        x[:-1] = kernel_solve(kernel, data, b[:-1])
+        return x
+    return kernel_solve(kernel, data, b)
+
+
+def kernel_solve(kernel, data, b):
+    if kernel.startswith('tridiagonal SPD'):
+        return linalg.lapack.dpttrs(*data, b)[0]
+    if kernel.startswith('tridiagonal'):
+        return linalg.lapack.dgttrs(*data, b)[0]
+    if kernel == 'banded Cholesky':
+        return linalg.cho_solve_banded((data[0], False), b)
+    if kernel == 'banded LU':
+        (lower, upper), lu, piv = data
+        return linalg.lapack.dgbtrs(lu, lower, upper, b, piv)[0]
+    return linalg.cho_solve(data, b)
+
+
+def spd_pivots(factor):
+    #positive pivots whose product is the determinant, for the SPD kernels (the
+    #Cholesky diagonal squared, the pttrf D), or None for the pivoted ones
+    kernel, data, _, _ = factor
+    if kernel.startswith('tridiagonal SPD'):
+        return data[0]
+    if kernel == 'banded Cholesky':
+        return data[0][-1] ** 2
+    if kernel == 'Cholesky':
+        return np.diag(data[0]) ** 2
+    return None
+
+
+def structured_min_norm_solve(factor, b):
+    #minimum-norm (pseudo-inverse) solution: the unique one for an SPD matrix, and for
+    #a grounded connected Laplacian the one orthogonal to its constant null vector
+    if not factor[2]:
+        return structured_factor_solve(factor, b)
+    #project b onto the range (zero net demand) and the solution onto its complement
+    b = np.asarray(b, dtype=np.float64)
+    x = structured_factor_solve(factor, b - b.mean(axis=0))
+    return x - x.mean(axis=0)
@@ -0,0 +1,228 @@
+"""Qt views that show large network matrices and solutions without turning them into text."""
+import numpy as np
+import scipy.sparse as sp
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex
+from PyQt5.QtWidgets import QTableView, QHeaderView
+import matplotlib.pyplot as plt
+from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+
+#resolution of the downsampled sparsity image
+SPY_BINS = 256
+
+#rows a solution table hands to its view at a time
+PAGE_SIZE = 1000
+
+
+class MatrixTableModel(QAbstractTableModel):
+    #read-only [A | b] table that formats an entry only when the view asks for it
+    def __init__(self, A, b=None, precision=4, parent=None):
+        super().__init__(parent)
+        if sp.issparse(A):
+            A = sp.csr_matrix(A)
+            A.sum_duplicates()
+            A.sort_indices()
+        self.A = A
+        self.b = b
+        self.precision = precision
+
+    def rowCount(self, parent=None):
+        return self.A.shape[0]
+
+    def columnCount(self, parent=None):
+        return self.A.shape[1] + (self.b is not None)
+
+    def entry(self, row, col):
+        #value of A[row, col] (or b[row] past the last column), None for a structural zero
+        if col == self.A.shape[1]:
+            return self.b[row]
+        if not sp.issparse(self.A):
+            return self.A[row, col]
+        start, end = self.A.indptr[row], self.A.indptr[row + 1]
+        k = start + np.searchsorted(self.A.indices[start:end], col)
+        if k < end and self.A.indices[k] == col:
+            return self.A.data[k]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == Qt.DisplayRole:
+            value = self.entry(index.row(), index.column())
+            return "" if value is None else f"{value:.{self.precision}g}"
+        if role == Qt.TextAlignmentRole:
+            return int(Qt.AlignRight | Qt.AlignVCenter)
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal and section == self.A.shape[1]:
+            return "b"
+        return str(section + 1)
+
+
+def matrix_table(A, b=None):
+    #table view over A and b with fixed-size rows and columns, so Qt never measures every cell
+    view = QTableView()
+    view.setModel(MatrixTableModel(A, b, parent=view))
+    for header in (view.horizontalHeader(), view.verticalHeader()):
+        header.setSectionResizeMode(QHeaderView.Fixed)
+    view.horizontalHeader().setDefaultSectionSize(70)
+    view.setAlternatingRowColors(True)
+    return view
+
+
+class SolutionTableModel(QAbstractTableModel):
+    #one row per flow component and one column per method, followed by the difference
+    #of every other method from a reference one; rows are handed out a page at a time
+    #and sorting only permutes an index array
+    def __init__(self, n, methods, page_size=PAGE_SIZE, precision=6, parent=None):
+        super().__init__(parent)
+        self.n = n
+        self.methods = list(methods)
+        self.page_size = page_size
+        self.precision = precision
+        self.solutions = {}
+        self.reference = None
+        self.reference_chosen = False
+        self.order = np.arange(n)
+        self.loaded = min(page_size, n)
+        self.sort_column = -1
+        self.sort_order = Qt.AscendingOrder
+        self.columns = []
+
+    def add_solution(self, method, x):
+        #add a finished method's solution vector as a new column
+        self.beginResetModel()
+        self.solutions[method] = np.asarray(x)
+        if not self.reference_chosen:
+            #until one is picked, the reference is the earliest listed method that has finished
+            self.reference = next(m for m in self.methods if m in self.solutions)
+        self.update_columns()
+        self.endResetModel()
+
+    def set_reference(self, method):
+        #method the difference columns are measured against
+        if method not in self.solutions:
+            return
+        self.reference_chosen = True
+        if method == self.reference:
+            return
+        self.beginResetModel()
+        self.reference = method
+        self.update_columns()
+        self.endResetModel()
+
+    def update_columns(self):
+        #(header, method, subtract reference) per column, then reapply the current sort
+        present = [m for m in self.methods if m in self.solutions]
+        self.columns = [(m, m, False) for m in present]
+        self.columns += [(f"{m} - {self.reference}", m, True) for m in present if m != self.reference]
+        if self.sort_column >= len(self.columns):
+            self.sort_column = -1
+        self.order = self.sorted_order(self.sort_column, self.sort_order)
+
+    def column_values(self, col, rows=slice(None)):
+        #values of one column at the given flow components
+        _, method, difference = self.columns[col]
+        values = self.solutions[method][rows]
+        if difference:
+            values = values - self.solutions[self.reference][rows]
+        return values
+
+    def sorted_order(self, column, order):
+        if column < 0:
+            return np.arange(self.n)
+        perm = np.argsort(self.column_values(column), kind='stable')
+        return perm[::-1] if order == Qt.DescendingOrder else perm
+
+    def rowCount(self, parent=None):
+        return self.loaded
+
+    def columnCount(self, parent=None):
+        return len(self.columns)
+
+    def canFetchMore(self, parent=None):
+        return self.loaded < self.n
+
+    def fetchMore(self, parent=None):
+        #the view asks for the next page when it scrolls to the end of the loaded rows
+        count = min(self.page_size, self.n - self.loaded)
+        self.beginInsertRows(QModelIndex(), self.loaded, self.loaded + count - 1)
+        self.loaded += count
+        self.endInsertRows()
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        self.layoutAboutToBeChanged.emit()
+        self.sort_column, self.sort_order = column, order
+        self.order = self.sorted_order(column, order)
+        self.layoutChanged.emit()
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == Qt.DisplayRole:
+            value = self.column_values(index.column(), self.order[index.row()])
+            return f"{value:.{self.precision}g}"
+        if role == Qt.TextAlignmentRole:
+            return int(Qt.AlignRight | Qt.AlignVCenter)
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return self.columns[section][0]
+        return f"Flow {self.order[section] + 1}"
+
+
+def solution_table(n, methods):
+    #sortable, paged table view over the solution vectors
+    view = QTableView()
+    view.setModel(SolutionTableModel(n, methods, parent=view))
+    for header in (view.horizontalHeader(), view.verticalHeader()):
+        header.setSectionResizeMode(QHeaderView.Fixed)
+    view.horizontalHeader().setDefaultSectionSize(110)
+    view.horizontalHeader().setSortIndicator(-1, Qt.AscendingOrder)
+    view.setSortingEnabled(True)
+    view.setAlternatingRowColors(True)
+    return view
+
+
+def spy_image(A, bins=SPY_BINS):
+    #nonzero count per block of a bins x bins grid over A, plus the block edges
+    n_rows, n_cols = A.shape
+    row_edges = np.unique(np.linspace(0, n_rows, min(bins, n_rows) + 1).astype(int))
+    col_edges = np.unique(np.linspace(0, n_cols, min(bins, n_cols) + 1).astype(int))
+
+    if sp.issparse(A):
+        A = sp.coo_matrix(A)
+        mask = A.data != 0
+        rows = np.searchsorted(row_edges, A.row[mask], side='right') - 1
+        cols = np.searchsorted(col_edges, A.col[mask], side='right') - 1
+        n_bins = len(col_edges) - 1
+        counts = np.bincount(rows * n_bins + cols, minlength=(len(row_edges) - 1) * n_bins)
+        counts = counts.reshape(len(row_edges) - 1, n_bins)
+    else:
+        nonzero = np.asarray(A) != 0
+        counts = np.add.reduceat(nonzero, row_edges[:-1], axis=0, dtype=np.int64)
+        counts = np.add.reduceat(counts, col_edges[:-1], axis=1)
+    return counts, row_edges, col_edges
+
+
+class SpyView(FigureCanvas):
+    #downsampled sparsity pattern: each pixel shows the fill of one block of A
+    def __init__(self, A, bins=SPY_BINS):
+        fig, ax = plt.subplots(figsize=(4, 4))
+        fig.set_tight_layout(True)
+        super().__init__(fig)
+
+        counts, row_edges, col_edges = spy_image(A, bins)
+        area = np.outer(np.diff(row_edges), np.diff(col_edges))
+        fill = np.ma.masked_equal(counts / area, 0)
+        ax.imshow(fill, cmap='Blues', vmin=0, vmax=fill.max() if fill.count() else 1.0,
+                  extent=(0, A.shape[1], A.shape[0], 0), interpolation='nearest', aspect='auto')
+        nnz = A.nnz if sp.issparse(A) else int(np.count_nonzero(A))
+        ax.set_title(f"Sparsity pattern ({nnz} nonzeros)")
+        ax.set_xlabel('Column')
+        ax.set_ylabel('Row')
@@ -0,0 +1,105 @@
+"""Mixed-precision direct solves: a float32 factorization refined to float64 accuracy.
+
+The LU factors are computed in single precision, which halves their memory and
+speeds up the factorization. Each solve then runs classical iterative
+refinement, as LAPACK's dsgesv does:
+
+    r = b - A x        (float64)
+    A d = r            (float32 factors)
+    x = x + d
+
+until the backward error is at float64 level (or dsgesv's sqrt(n) times
+that once it stops improving). Refinement converges while
+cond(A) * eps32 < 1. Worse-conditioned systems stall, and the caller falls
+back to the float64 factorization.
+"""
+import warnings
+
+import numpy as np
+import scipy.sparse as sp
+from scipy import linalg
+from scipy.sparse import linalg as spla
+
+import matrix_structure
+
+#LAPACK dsgesv gives up after 30 refinement steps
+MAX_REFINE_STEPS = 30
+
+#a step must shrink the residual at least this much, or refinement has stalled
+STALL_RATIO = 0.9
+
+
+def single_factor(A, structure=None):
+    #(float32 LU, grounded, float64 matrix) of A, grounded like the float64 kernels;
+    #None when the float32 factors are singular
+    structure = structure or matrix_structure.analyze_structure(A)
+    S, grounded = matrix_structure.grounded_block(A, structure)
+    if sp.issparse(S):
+        try:
+            lu = spla.splu(sp.csc_matrix(S, dtype=np.float32))
+        except RuntimeError:
+            return None
+        pivots = lu.U.diagonal()
+    else:
+        with warnings.catch_warnings():
+            #an exactly singular matrix only warns; the pivot test below rejects it
+            warnings.simplefilter('ignore', linalg.LinAlgWarning)
+            lu = linalg.lu_factor(np.asarray(S, dtype=np.float32), check_finite=False)
+        pivots = np.diagonal(lu[0])
+    pivots = np.abs(pivots)
+    if not np.all(np.isfinite(pivots)) or pivots.min() <= np.finfo(np.float32).eps * pivots.max():
+        return None
+    return lu, grounded, S
+
+
+def single_solve(lu, r):
+    #float32 back-substitution, returned in float64
+    r = r.astype(np.float32)
+    if isinstance(lu, spla.SuperLU):
+        return lu.solve(r).astype(np.float64)
+    return linalg.lu_solve(lu, r, check_finite=False).astype(np.float64)
+
+
+def refined_solve(factor, b, max_steps=MAX_REFINE_STEPS):
+    #(x, steps) for a vector or an (n, k) block; x is None when refinement stalls
+    lu, grounded, S = factor
+    b = np.asarray(b, dtype=np.float64)
+    rhs = b[:-1] if grounded else b
+    #refine towards eps64 |A|_inf max|x| per column; stalling is only accepted once
+    #dsgesv's looser sqrt(n) eps64 |A|_inf max|x| has been reached
+    tol = np.finfo(np.float64).eps * abs(S).sum(axis=1).max()
+    loose = np.sqrt(S.shape[0]) * tol
+
+    x = np.zeros(rhs.shape)
+    r = rhs.copy()
+    r_norm = np.abs(r).max(axis=0)
+    steps = 0
+    while np.any(r_norm > tol * np.abs(x).max(axis=0)):
+        #scale each column to unit size so small residuals do not underflow in float32
+        scale = np.where(r_norm > 0, r_norm, 1.0)
+        x += single_solve(lu, r / scale) * scale
+        r = rhs - S @ x
+        previous, r_norm = r_norm, np.abs(r).max(axis=0)
+        steps += 1
+        if steps == max_steps or np.any(r_norm > STALL_RATIO * previous):
+            if np.any(r_norm > loose * np.abs(x).max(axis=0)):
+                return None, steps
+            break
+
+    if grounded:
+        full = np.zeros(b.shape)
+        full[:-1] = x
+        x = full
+    return x, steps
+
+
+def refined_min_norm_solve(factor, b, max_steps=MAX_REFINE_STEPS):
+    #minimum-norm solution: A^-1 b, or for a grounded connected Laplacian the
+    #zero-mean solution of the zero-net-demand part of b
+    if not factor[1]:
+        return refined_solve(factor, b, max_steps)
+    b = np.asarray(b, dtype=np.float64)
+    x, steps = refined_solve(factor, b - b.mean(axis=0), max_steps)
+    if x is None:
+        return None, steps
+    return x - x.mean(axis=0), steps
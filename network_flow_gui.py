@@ -1,19 +1,87 @@
-from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, 
+from PyQt5.QtWidgets import (QApplication, QWidget, QVBoxLayout, QHBoxLayout, QLabel, 
                              QTabWidget, QTreeWidget, QTreeWidgetItem, 
-                             QGroupBox, QScrollArea)
-from PyQt5.QtCore import Qt
+                             QGroupBox, QScrollArea, QProgressBar, QComboBox)
+from PyQt5.QtCore import Qt, QObject, QThread, pyqtSignal
 from PyQt5.QtGui import QFont
+import os
 import numpy as np
-from scipy import linalg
+import scipy.sparse as sp
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-import time
+import fast_plots
+import matrix_views
+import network_loader
+import network_solver
+
+#networks at least this large are solved on a process pool instead of threads
+PROCESS_POOL_MIN_SIZE = 50000
+
+#Status column text for the outcome of an iterative method
+ITERATION_STATUS = {
+    'converged': "Converged",
+    'max_iter': "Not converged",
+    'stagnated': "Stagnated (stopped early)",
+    'diverged': "Diverged (stopped early)",
+    'stopped': "Stopped",
+}
+
+#solver threads still running; they are not owned by their window, which may be
+#closed or replaced mid-solve, and are joined when the application quits
+running_threads = set()
+
+def wait_for_solvers():
+    for thread in list(running_threads):
+        thread.wait()
+    running_threads.clear()
+
+class SolverWorker(QObject):
+    #runs every method concurrently from a background thread and reports each result
+    method_finished = pyqtSignal(str, object)
+    finished = pyqtSignal(object)
+    
+    def __init__(self, A, b, methods, precision='double'):
+        super().__init__()
+        self.A = A
+        self.b = b
+        self.methods = methods
+        self.precision = precision
+        self.cancelled = False
+    
+    def cancel(self):
+        #called from the GUI thread; methods that have not started are skipped
+        self.cancelled = True
+    
+    def run(self):
+        solutions = {}
+        processes = self.A.shape[0] >= PROCESS_POOL_MIN_SIZE
+        results = network_solver.iter_solutions(self.A, self.b, self.methods,
+                                                processes=processes, precision=self.precision)
+        for method, data in results:
+            if self.cancelled:
+                results.close()
+                break
+            solutions[method] = data
+            self.method_finished.emit(method, data)
+        self.finished.emit(solutions)
 
 class NetworkFlowGUI(QWidget):
-    def __init__(self):
+    def __init__(self, sparse=False, decimate=None, network_path=None, demand_path=None, precision='double'):
         #initialize GUI
         super().__init__()
         
+        #sparse mode keeps A in CSR form through every solver
+        self.sparse = sparse
+        
+        #a network file replaces the built-in 4-node example (always sparse)
+        self.network_path = network_path
+        self.demand_path = demand_path
+        
+        #'mixed' factors the direct methods in float32 and refines them to float64 accuracy
+        self.precision = precision
+        
+        #decimated plots draw at screen resolution (None = decide from the network size)
+        self.decimate = decimate
+        
         self.setup_gui()
         self.solve_and_display()
         
@@ -41,132 +109,128 @@ class NetworkFlowGUI(QWidget):
         self.plots_layout = QVBoxLayout(self.plots_widget)
         self.matrix_layout = QVBoxLayout(self.matrix_widget)
         
+        #placeholders until every solver has finished
+        self.placeholders = []
+        for layout in (self.plots_layout, self.matrix_layout):
+            placeholder = QLabel("Waiting for the solvers to finish...")
+            placeholder.setAlignment(Qt.AlignCenter)
+            layout.addWidget(placeholder)
+            self.placeholders.append(placeholder)
+        
+        #matrix properties are only computed the first time their tab is shown
+        self.matrix_info_shown = False
+        self.tabs.currentChanged.connect(self.tab_changed)
+        
+    def load_network(self):
+        #sparse Laplacian and demands of the network file, built without a dense intermediate
+        problem = network_loader.load_network(self.network_path, self.demand_path)
+        if problem['b'] is None:
+            raise ValueError(f"{self.network_path} has no demands; choose a demand file as well")
+        self.network_edges = problem.get('edges')
+        return sp.csr_matrix(problem['A']), np.asarray(problem['b'], dtype=np.float64)
+    
     def solve_and_display(self):
-        A = np.array([
-            [1, -1, 0, 0],
-            [-1, 2, -1, 0],
-            [0, -1, 2, -1],
-            [0, 0, -1, 1]
-        ], dtype=np.float64)
-        
-        b = np.array([10, 5, -3, -12], dtype=np.float64)
-        
-        solutions = self.compute_solutions(A, b)
-        self.display_matrix_info(A, b)
-        self.display_solutions(solutions)
-        self.create_plots(solutions)
+        if self.network_path:
+            A, b = self.load_network()
+        else:
+            A = np.array([
+                [1, -1, 0, 0],
+                [-1, 2, -1, 0],
+                [0, -1, 2, -1],
+                [0, 0, -1, 1]
+            ], dtype=np.float64)
+            
+            b = np.array([10, 5, -3, -12], dtype=np.float64)
+            
+            if self.sparse:
+                A = sp.csr_matrix(A)
+        
+        self.A, self.b = A, b
+        if self.decimate is None:
+            self.decimate = A.shape[0] >= fast_plots.FAST_PLOT_MIN_POINTS
+        self.methods = network_solver.applicable_methods(A)
+        self.display_solutions(self.methods)
+        
+        #solve off the GUI thread so the window shows up and stays responsive; the thread
+        #has no parent, so closing the window cancels it instead of destroying it mid-solve
+        thread = QThread()
+        worker = SolverWorker(A, b, self.methods, self.precision)
+        worker.moveToThread(thread)
+        thread.started.connect(worker.run)
+        worker.method_finished.connect(self.update_solution)
+        worker.finished.connect(self.solutions_ready)
+        #quit directly from the worker thread: a queued quit would never run while
+        #wait_for_solvers blocks the GUI thread
+        worker.finished.connect(thread.quit, Qt.DirectConnection)
+        worker.finished.connect(worker.deleteLater)
+        thread.finished.connect(thread.deleteLater)
+        thread.finished.connect(lambda: running_threads.discard(thread))
+        #the worker thread is busy in run(), so the flag is set directly
+        self.destroyed.connect(worker.cancel, Qt.DirectConnection)
+        if not running_threads:
+            QApplication.instance().aboutToQuit.connect(wait_for_solvers)
+        running_threads.add(thread)
+        self.solver_thread, self.solver_worker = thread, worker
+        thread.start()
+    
+    def closeEvent(self, event):
+        #stop starting new methods once the window is closed
+        if self.solver_thread in running_threads:
+            self.solver_worker.cancel()
+        super().closeEvent(event)
+    
+    def solutions_ready(self, solutions):
+        #all methods are done: fill in the plots and matrix tabs
+        self.solutions = {method: solutions[method] for method in self.methods
+                          if solutions.get(method) and 'error' not in solutions[method]}
+        self.progress.hide()
+        self.placeholders[0].deleteLater()
+        
+        if not self.solutions:
+            #nothing to plot: show why every method failed instead
+            errors = [f"{method}: {solutions[method]['error']}" for method in self.methods
+                      if solutions.get(method) and 'error' in solutions[method]]
+            message = "Every method failed:\n" + "\n".join(errors) if errors else "No method produced a solution."
+            error_label = QLabel(message)
+            error_label.setWordWrap(True)
+            error_label.setAlignment(Qt.AlignCenter)
+            self.plots_layout.addWidget(error_label)
+        else:
+            self.create_plots(self.solutions)
+        if self.tabs.currentWidget() is self.matrix_widget:
+            self.show_matrix_info()
+    
+    def tab_changed(self, index):
+        #build the Matrix Info tab on first view, once the solvers have shared their factors
+        if self.tabs.widget(index) is self.matrix_widget and hasattr(self, 'solutions'):
+            self.show_matrix_info()
+    
+    def show_matrix_info(self):
+        if self.matrix_info_shown:
+            return
+        self.matrix_info_shown = True
+        self.placeholders[1].deleteLater()
+        self.display_matrix_info(self.A, self.b)
         
     def compute_solutions(self, A, b):
         #compute solutions with multiple numerical methods
-        solutions = {}
-        
-        #SVD solution
-        t0 = time.time()
-        U, s, Vh = linalg.svd(A)
-        tol = 1e-10
-        s_inv = np.array([1/x if x > tol else 0 for x in s])
-        solutions['SVD'] = {
-            'solution': Vh.T @ (s_inv * (U.T @ b)),
-            'time': time.time() - t0
-        }
-        
-        #Gauss Elimination solution
-        t0 = time.time()
-        solutions['Gauss'] = {
-            'solution': self.gauss_elimination(A, b),
-            'time': time.time() - t0
-        }
-        
-        #Jacobi solution
-        t0 = time.time()
-        jacobi_solution, jacobi_history = self.jacobi_method(A, b)
-        solutions['Jacobi'] = {
-            'solution': jacobi_solution,
-            'history': jacobi_history,
-            'time': time.time() - t0
-        }
-        
-        #Gauss-Seidel solution
-        t0 = time.time()
-        gs_solution, gs_history = self.gauss_seidel_method(A, b)
-        solutions['Gauss-Seidel'] = {
-            'solution': gs_solution,
-            'history': gs_history,
-            'time': time.time() - t0
-        }
-        
-        #calculate residuals
-        for method in solutions:
-            solutions[method]['residual'] = np.linalg.norm(A @ solutions[method]['solution'] - b)
-        
-        return solutions
+        return network_solver.compute_solutions(A, b)
     
     def gauss_elimination(self, A, b):
         #solve system with Gauss elimination / partial pivoting
-        n = len(A)
-        Ab = np.column_stack((A.copy(), b.copy()))
-        
-        for i in range(n):
-            pivot = abs(Ab[i:, i]).argmax() + i
-            if pivot != i:
-                Ab[i], Ab[pivot] = Ab[pivot].copy(), Ab[i].copy()
-            
-            for j in range(i+1, n):
-                if Ab[i,i] != 0:
-                    factor = Ab[j,i] / Ab[i,i]
-                    Ab[j, i:] -= factor * Ab[i, i:]
-        
-        x = np.zeros(n)
-        for i in range(n-1, -1, -1):
-            if abs(Ab[i,i]) < 1e-10:
-                continue
-            x[i] = (Ab[i,-1] - np.dot(Ab[i,i+1:n], x[i+1:])) / Ab[i,i]
-        
-        return x
+        return network_solver.gauss_elimination(A, b)
     
     def jacobi_method(self, A, b, max_iter=1000, tol=1e-10):
         #solve with Jacobi / iterative method
-
-        n = len(A)
-        x = np.zeros(n)
-        D = np.diag(A)
-        R = A - np.diagflat(D)
-        history = []
-        
-        for i in range(max_iter):
-            x_old = x.copy()
-            x = (b - np.dot(R, x)) / D
-            error = np.linalg.norm(x - x_old) / np.linalg.norm(x)
-            history.append(error)
-            
-            if error < tol:
-                print(f"Jacobi method converged in {i+1} iterations")
-                return x, history
-        
-        print("Jacobi method did not converge within maximum iterations")
-        return x, history
+        return network_solver.jacobi_method(A, b, max_iter, tol)
     
     def gauss_seidel_method(self, A, b, max_iter=1000, tol=1e-10):
         #solve with Gauss-Seidel / iterative method
-        n = len(A)
-        x = np.zeros(n)
-        history = []
-        
-        for i in range(max_iter):
-            x_old = x.copy()
-            for j in range(n):
-                x[j] = (b[j] - np.sum(A[j,:j] * x[:j]) - 
-                       np.sum(A[j,j+1:] * x_old[j+1:])) / A[j,j]
-            
-            error = np.linalg.norm(x - x_old) / np.linalg.norm(x)
-            history.append(error)
-            
-            if error < tol:
-                print(f"Gauss-Seidel method converged in {i+1} iterations")
-                return x, history
-        
-        print("Gauss-Seidel method did not converge within maximum iterations")
-        return x, history
+        return network_solver.gauss_seidel_method(A, b, max_iter, tol)
+    
+    def sor_method(self, A, b, omega=None, max_iter=1000, tol=1e-10):
+        #solve with successive over-relaxation / iterative method
+        return network_solver.sor_method(A, b, omega, max_iter, tol)
     
     def display_matrix_info(self, A, b):
         #add title
@@ -178,44 +242,36 @@ class NetworkFlowGUI(QWidget):
         #matrix visualization
         matrix_group = QGroupBox("System Matrix (A)")
         self.matrix_layout.addWidget(matrix_group)
-        matrix_layout = QVBoxLayout(matrix_group)
-        
-        matrix_text = "A = \n"
-        for row in A:
-            matrix_text += "    [ "
-            for val in row:
-                matrix_text += f"{val:5.1f} "
-            matrix_text += "]\n"
-        
-        matrix_label = QLabel(matrix_text)
-        matrix_label.setFont(QFont("Courier", 12))
-        matrix_layout.addWidget(matrix_label)
+        matrix_layout = QHBoxLayout(matrix_group)
         
-        #right-hand side visualization
-        b_text = "b = [ "
-        for val in b:
-            b_text += f"{val:5.1f} "
-        b_text += "]"
-        
-        b_label = QLabel(b_text)
-        b_label.setFont(QFont("Courier", 12))
-        matrix_layout.addWidget(b_label)
+        #[A | b] as a virtual table that only formats the visible cells,
+        #next to a downsampled sparsity pattern of A
+        matrix_layout.addWidget(matrix_views.matrix_table(A, b), 3)
+        matrix_layout.addWidget(matrix_views.SpyView(A), 2)
         
         #add matrix properties
         props_group = QGroupBox("Properties")
         self.matrix_layout.addWidget(props_group)
         props_layout = QVBoxLayout(props_group)
         
-        cond_num = np.linalg.cond(A)
-        det = np.linalg.det(A)
-        rank = np.linalg.matrix_rank(A)
+        #one shared factorization, preferring what the solvers cached: the SVD gives exact
+        #2-norm values, the SPD / LU factors 1-norm estimates, and a grounded Laplacian
+        #the assumed rank n - 1, all marked as estimates
+        props = network_solver.matrix_properties(A)
+        estimate = " (estimate)" if props['estimated'] else ""
         
         props_text = (
-            f"Condition Number: {cond_num:.2e}\n"
-            f"Determinant: {det:.2e}\n"
-            f"Rank: {rank}\n"
+            f"Condition Number ({props['cond_norm']}-norm): {props['cond']:.2e}{estimate}\n"
+            f"Determinant: {props['det']:.2e}\n"
+            f"log|det|: {props['logdet']:.4g} (sign {props['sign']:+.0f})\n"
+            f"Rank: {props['rank']}{estimate}\n"
             f"Size: {A.shape[0]}x{A.shape[1]}"
         )
+        if sp.issparse(A):
+            props_text += (
+                f"\nNonzeros: {A.nnz}\n"
+                f"Density: {A.nnz / (A.shape[0] * A.shape[1]):.2e}"
+            )
         
         props_label = QLabel(props_text)
         props_label.setFont(QFont("Courier", 10))
@@ -233,7 +289,7 @@ class NetworkFlowGUI(QWidget):
         explanation_label.setAlignment(Qt.AlignCenter)
         self.matrix_layout.addWidget(explanation_label)
     
-    def display_solutions(self, solutions):
+    def display_solutions(self, methods):
         #add title
         title = QLabel("Flow Solution Results")
         title.setStyleSheet("font-size: 18px; font-weight: bold;")
@@ -252,36 +308,47 @@ class NetworkFlowGUI(QWidget):
         
         #create a tree widget for the table
         tree = QTreeWidget()
-        tree.setHeaderLabels(["Method", "Flow Values", "Residual", "Time (s)", "Iterations"])
+        tree.setHeaderLabels(["Method", "Status", "Residual", "Time (s)", "Iterations", "Kernel"])
         tree.setAlternatingRowColors(True)
         tree.setRootIsDecorated(False)
         scroll_layout.addWidget(tree)
+        self.solutions_tree = tree
         
-        #add data
-        for method, data in solutions.items():
-            solution_str = np.array2string(data['solution'], precision=4, suppress_small=True)
-            iterations = "N/A"
-            if 'history' in data:
-                iterations = str(len(data['history']))
-            
-            item = QTreeWidgetItem([
-                method, 
-                solution_str, 
-                f"{data['residual']:.2e}", 
-                f"{data['time']:.5f}",
-                iterations
-            ])
+        #one row per method, filled in as each solver finishes
+        self.solution_items = {}
+        for method in methods:
+            item = QTreeWidgetItem([method, "Solving...", "", "", "", ""])
             tree.addTopLevelItem(item)
-        
-        #auto-adjust column widths
-        for i in range(tree.columnCount()):
-            tree.resizeColumnToContents(i)
+            self.solution_items[method] = item
+        
+        #flow values per component, backed directly by the solution arrays
+        values_group = QGroupBox("Flow Values")
+        self.results_layout.addWidget(values_group, 2)
+        values_layout = QVBoxLayout(values_group)
+        
+        reference_layout = QHBoxLayout()
+        reference_layout.addWidget(QLabel("Differences relative to:"))
+        self.reference_box = QComboBox()
+        reference_layout.addWidget(self.reference_box)
+        reference_layout.addStretch()
+        values_layout.addLayout(reference_layout)
+        
+        self.values_table = matrix_views.solution_table(len(self.b), methods)
+        self.reference_box.activated[str].connect(self.values_table.model().set_reference)
+        values_layout.addWidget(self.values_table)
+        
+        #progress across methods
+        self.progress = QProgressBar()
+        self.progress.setRange(0, len(methods))
+        self.progress.setValue(0)
+        self.progress.setFormat("%v of %m methods solved")
+        self.results_layout.addWidget(self.progress)
         
         #add explanation
         explanation = (
             "The solution represents the flow values between nodes in the transportation network.\n"
             "A lower residual value indicates a more accurate solution.\n"
-            "The iterative methods (Jacobi and Gauss-Seidel) may take more time but can be more stable for certain problems."
+            "The iterative methods (Jacobi, Gauss-Seidel, SOR and Laplacian PCG) may take more time but can be more stable for certain problems."
         )
         
         explanation_label = QLabel(explanation)
@@ -294,43 +361,100 @@ class NetworkFlowGUI(QWidget):
         self.results_layout.addWidget(interp_group)
         interp_layout = QVBoxLayout(interp_group)
         
-        interp_text = (
-            "The system represents a network with 4 nodes:\n"
-            "• Node 1 requires a net flow of +10 units (source)\n"
-            "• Node 2 requires a net flow of +5 units (source)\n"
-            "• Node 3 requires a net flow of -3 units (sink)\n"
-            "• Node 4 requires a net flow of -12 units (sink)\n\n"
-            "The solution values represent the amount of flow between connected nodes."
-        )
+        if self.network_path:
+            edges = f" and {self.network_edges} edges" if self.network_edges else ""
+            interp_text = (
+                f"The system represents a network with {len(self.b)} nodes{edges}, "
+                f"loaded from {os.path.basename(self.network_path)}.\n"
+                "Nodes with a positive demand are sources and nodes with a negative demand are sinks.\n\n"
+                "The solution values represent the amount of flow between connected nodes."
+            )
+        else:
+            interp_text = (
+                "The system represents a network with 4 nodes:\n"
+                "• Node 1 requires a net flow of +10 units (source)\n"
+                "• Node 2 requires a net flow of +5 units (source)\n"
+                "• Node 3 requires a net flow of -3 units (sink)\n"
+                "• Node 4 requires a net flow of -12 units (sink)\n\n"
+                "The solution values represent the amount of flow between connected nodes."
+            )
         
         interp_label = QLabel(interp_text)
         interp_label.setWordWrap(True)
         interp_layout.addWidget(interp_label)
     
+    def update_solution(self, method, data):
+        #fill in one method's row as soon as it finishes
+        item = self.solution_items[method]
+        if data is None or 'error' in data:
+            item.setText(1, "Failed: " + data['error'] if data else "Not applicable")
+        else:
+            iterations = "N/A"
+            if 'iterations' in data:
+                iterations = str(data['iterations'])
+            if 'predicted_iterations' in data:
+                #pre-check prediction next to the actual count; an estimate that did not
+                #converge predicts nothing
+                predicted = data['predicted_iterations']
+                if not data.get('spectral_radius_converged'):
+                    predicted = 'unknown'
+                iterations += f" (predicted {predicted if predicted is not None else 'never'})"
+            
+            item.setText(1, ITERATION_STATUS.get(data.get('status'), "Solved"))
+            item.setText(2, f"{data['residual']:.2e}")
+            item.setText(3, f"{data['time']:.5f}")
+            item.setText(4, iterations)
+            item.setText(5, data.get('kernel', ""))
+            
+            model = self.values_table.model()
+            model.add_solution(method, data['solution'])
+            self.reference_box.blockSignals(True)
+            self.reference_box.clear()
+            self.reference_box.addItems([m for m in self.methods if m in model.solutions])
+            self.reference_box.setCurrentText(model.reference)
+            self.reference_box.blockSignals(False)
+        
+        #auto-adjust column widths
+        for i in range(self.solutions_tree.columnCount()):
+            self.solutions_tree.resizeColumnToContents(i)
+        self.progress.setValue(self.progress.value() + 1)
+    
     def create_plots(self, solutions):
         fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(10, 8))
         fig.set_tight_layout(True)
         
         x = np.arange(len(next(iter(solutions.values()))['solution']))
-        width = 0.2
+        width = 0.8 / len(solutions)
         
         #solution comparison plot
         for i, (method, data) in enumerate(solutions.items()):
-            ax1.bar(x + i*width - width*len(solutions)/2, 
-                   data['solution'], width, label=method)
+            offset = i*width - width*len(solutions)/2
+            if self.decimate:
+                #one LineCollection per method, re-binned to the pixel width on zoom and pan
+                fast_plots.DecimatedBars(ax1, x, data['solution'], offset, width,
+                                         color=f'C{i}', label=method)
+            else:
+                ax1.bar(x + offset, data['solution'], width, label=method)
         
         ax1.set_xlabel('Flow Component')
         ax1.set_ylabel('Flow Value')
         ax1.set_title('Solution Comparison')
         ax1.legend()
         ax1.grid(True, alpha=0.3)
-        ax1.set_xticks(x)
-        ax1.set_xticklabels([f'Flow {i+1}' for i in x])
+        if not self.decimate:
+            ax1.set_xticks(x)
+            ax1.set_xticklabels([f'Flow {i+1}' for i in x])
         
         #convergence history plot
-        for method in ['Jacobi', 'Gauss-Seidel']:
-            if 'history' in solutions[method]:
-                ax2.semilogy(solutions[method]['history'], label=f"{method}")
+        ax2.set_yscale('log')
+        for method in ['Jacobi', 'Gauss-Seidel', 'SOR', 'Laplacian']:
+            if method in solutions and 'history' in solutions[method]:
+                data = solutions[method]
+                steps = data.get('history_iterations', np.arange(1, len(data['history']) + 1))
+                if self.decimate and len(steps):
+                    fast_plots.DecimatedLine(ax2, steps, data['history'], label=f"{method}")
+                else:
+                    ax2.plot(steps, data['history'], label=f"{method}")
         
         ax2.set_xlabel('Iteration')
         ax2.set_ylabel('Relative Error')
@@ -345,7 +469,7 @@ class NetworkFlowGUI(QWidget):
         #add explanation
         explanation = (
             "The top graph compares the flow values computed by each method.\n"
-            "The bottom graph shows the convergence history for the iterative methods (Jacobi and Gauss-Seidel).\n"
+            "The bottom graph shows the convergence history for the iterative methods (Jacobi, Gauss-Seidel, SOR and Laplacian PCG).\n"
             "The convergence rate indicates how quickly each method approaches the solution."
         )
         
@@ -356,7 +480,6 @@ class NetworkFlowGUI(QWidget):
 
 if __name__ == "__main__":
     import sys
-    from PyQt5.QtWidgets import QApplication
     app = QApplication(sys.argv)
     window = NetworkFlowGUI()
     window.show()
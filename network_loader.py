@@ -0,0 +1,189 @@
+"""Load transportation networks from edge-list, Matrix Market and NumPy files.
+
+Edge lists are read in chunks (text) or through a memory map (.npy) and turned
+straight into the sparse graph Laplacian A = D - W, so memory stays
+proportional to the number of edges and no dense matrix is ever built.
+
+Supported files:
+
+- ``.csv`` / ``.txt`` / ``.edges``: one ``source, target[, weight]`` edge per line
+- ``.mtx``: Matrix Market; a matrix with a zero diagonal is read as weighted
+  adjacency, anything else is used as the system matrix as is
+- ``.npy``: an ``(m, 2)`` or ``(m, 3)`` edge array
+- ``.npz``: edge arrays ``source``, ``target`` (and ``weight``), a CSR matrix
+  (``A_data``, ``A_indices``, ``A_indptr``, ``A_shape`` or ``scipy.sparse.save_npz``
+  keys) or a dense ``A``, optionally with a demand vector ``b``
+
+Demands come from the ``b`` array of an .npz file or from a separate file of
+``node, demand`` lines (or one demand per line in node order).
+"""
+import os
+import warnings
+
+import numpy as np
+import scipy.io
+import scipy.sparse as sp
+
+#edges parsed per chunk of a text edge list
+CHUNK_ROWS = 10**6
+
+EDGE_LIST_EXTENSIONS = ('.csv', '.txt', '.edges')
+NETWORK_EXTENSIONS = EDGE_LIST_EXTENSIONS + ('.mtx', '.npy')
+
+
+def load_network(path, demand_path=None, chunk_rows=CHUNK_ROWS):
+    #read a network file into a problem dict with the sparse matrix A, the demands b
+    #(None if the file has none) and the original label of every node
+    ext = os.path.splitext(path)[1].lower()
+    if ext in EDGE_LIST_EXTENSIONS:
+        problem = edge_problem(*read_edge_list(path, chunk_rows))
+    elif ext == '.npy':
+        problem = edge_problem(*read_edge_array(path, chunk_rows))
+    elif ext == '.mtx':
+        problem = read_matrix_market(path)
+    elif ext == '.npz':
+        problem = load_npz(path)
+    else:
+        raise ValueError(f"unsupported network file: {path}")
+
+    problem.setdefault('b', None)
+    if demand_path is not None:
+        problem['b'] = read_demands(demand_path, problem['nodes'])
+    return problem
+
+
+def edge_problem(source, target, weight):
+    #relabel node ids to 0..n-1 and build the Laplacian of the edge list
+    nodes, index = np.unique(np.concatenate((source, target)), return_inverse=True)
+    m = len(source)
+    A = laplacian_from_edges(index[:m], index[m:], weight, len(nodes))
+    return {'A': A, 'nodes': nodes, 'edges': m}
+
+
+def laplacian_from_edges(source, target, weight, n):
+    #A = D - W for undirected edges; parallel edges add up and self-loops drop out
+    keep = source != target
+    source, target, weight = source[keep], target[keep], weight[keep]
+    degree = np.bincount(source, weights=weight, minlength=n) + np.bincount(target, weights=weight, minlength=n)
+    diagonal = np.arange(n)
+    A = sp.coo_matrix((np.concatenate((-weight, -weight, degree)),
+                       (np.concatenate((source, target, diagonal)),
+                        np.concatenate((target, source, diagonal)))),
+                      shape=(n, n))
+    return A.tocsr()
+
+
+def read_edge_list(path, chunk_rows=CHUNK_ROWS):
+    #parse a text edge list chunk_rows lines at a time; a non-numeric first line is a header
+    delimiter = ',' if path.lower().endswith('.csv') else None
+    sources, targets, weights = [], [], []
+    with open(path) as f:
+        skip = 1 if is_header(f.readline(), delimiter) else 0
+        f.seek(0)
+        with warnings.catch_warnings():
+            #loadtxt warns when the last read finds the end of the file
+            warnings.simplefilter('ignore', UserWarning)
+            while True:
+                chunk = np.loadtxt(f, delimiter=delimiter, comments=('#', '%'), skiprows=skip,
+                                   max_rows=chunk_rows, ndmin=2)
+                skip = 0
+                if chunk.size == 0:
+                    break
+                sources.append(chunk[:, 0].astype(np.int64))
+                targets.append(chunk[:, 1].astype(np.int64))
+                weights.append(chunk[:, 2] if chunk.shape[1] > 2 else np.ones(len(chunk)))
+
+    if not sources:
+        raise ValueError(f"{path} has no edges")
+    return np.concatenate(sources), np.concatenate(targets), np.concatenate(weights)
+
+
+def is_header(line, delimiter):
+    line = line.strip()
+    if not line or line[0] in '#%':
+        return False
+    try:
+        [float(token) for token in line.split(delimiter)]
+    except ValueError:
+        return True
+    return False
+
+
+def read_edge_array(path, chunk_rows=CHUNK_ROWS):
+    #memory-mapped (m, 2) or (m, 3) edge array, copied out a chunk at a time
+    edges = np.load(path, mmap_mode='r')
+    if edges.ndim != 2 or edges.shape[1] not in (2, 3):
+        raise ValueError(f"{path} must hold an (m, 2) or (m, 3) edge array, not {edges.shape}")
+    m = len(edges)
+    source, target = np.empty(m, dtype=np.int64), np.empty(m, dtype=np.int64)
+    weight = np.ones(m)
+    for start in range(0, m, chunk_rows):
+        chunk = np.asarray(edges[start:start + chunk_rows])
+        source[start:start + len(chunk)] = chunk[:, 0]
+        target[start:start + len(chunk)] = chunk[:, 1]
+        if edges.shape[1] == 3:
+            weight[start:start + len(chunk)] = chunk[:, 2]
+    return source, target, weight
+
+
+def read_matrix_market(path):
+    #Matrix Market file; a zero diagonal marks a weighted adjacency matrix
+    symmetry = scipy.io.mminfo(path)[5]
+    M = sp.coo_matrix(scipy.io.mmread(path))
+    if M.shape[0] != M.shape[1]:
+        raise ValueError(f"{path} holds a {M.shape[0]}x{M.shape[1]} matrix; a network matrix must be square")
+    n = M.shape[0]
+    if np.any(M.diagonal() != 0):
+        return {'A': M.tocsr(), 'nodes': np.arange(n), 'edges': None}
+
+    if symmetry != 'general':
+        #symmetric files list every edge in one triangle; mmread mirrors it
+        M = sp.triu(M, format='coo')
+    A = laplacian_from_edges(M.row.astype(np.int64), M.col.astype(np.int64), M.data.astype(np.float64), n)
+    return {'A': A, 'nodes': np.arange(n), 'edges': M.nnz}
+
+
+def load_npz(path):
+    #every array in an .npz file, with the network matrix (if any) assembled into A
+    with np.load(path) as data:
+        problem = {key: data[key] for key in data.files}
+
+    if 'source' in problem:
+        weight = problem.pop('weight', None)
+        source, target = problem.pop('source').astype(np.int64), problem.pop('target').astype(np.int64)
+        weight = np.ones(len(source)) if weight is None else weight.astype(np.float64)
+        problem.update(edge_problem(source, target, weight))
+    elif 'A_data' in problem:
+        problem['A'] = sp.csr_matrix(
+            (problem.pop('A_data'), problem.pop('A_indices'), problem.pop('A_indptr')),
+            shape=tuple(problem.pop('A_shape')))
+    elif 'indptr' in problem and 'format' in problem:
+        #written by scipy.sparse.save_npz
+        problem['A'] = sp.load_npz(path)
+        for key in ('data', 'indices', 'indptr', 'format', 'shape'):
+            problem.pop(key)
+
+    if 'A' in problem and 'nodes' not in problem:
+        problem['nodes'] = np.arange(problem['A'].shape[0])
+    return problem
+
+
+def read_demands(path, nodes):
+    #demand per node from 'node, demand' lines, or one value per line in node order
+    delimiter = ',' if path.lower().endswith('.csv') else None
+    with open(path) as f:
+        first = f.readline()
+        skip = 1 if is_header(first, delimiter) else 0
+    data = np.loadtxt(path, delimiter=delimiter, comments=('#', '%'), skiprows=skip, ndmin=2)
+
+    if data.shape[1] == 1:
+        if len(data) != len(nodes):
+            raise ValueError(f"{path} has {len(data)} demands for {len(nodes)} nodes")
+        return data[:, 0].copy()
+
+    ids = data[:, 0].astype(np.int64)
+    index = np.searchsorted(nodes, ids)
+    found = (index < len(nodes)) & (nodes[np.minimum(index, len(nodes) - 1)] == ids)
+    if not np.all(found):
+        raise ValueError(f"{path} has demands for unknown nodes, e.g. {ids[~found][0]}")
+    return np.bincount(index, weights=data[:, 1], minlength=len(nodes))
@@ -0,0 +1,908 @@
+"""Qt-free solvers for the transportation network flow problem (A5)."""
+import multiprocessing
+import time
+import warnings
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+
+import numpy as np
+from scipy import linalg
+import scipy.sparse as sp
+from scipy.sparse import csgraph
+from scipy.sparse import linalg as spla
+
+import laplacian_solver
+import matrix_structure
+import mixed_precision
+from factor_cache import FactorCache, matrix_key
+
+METHODS = ('SVD', 'Gauss', 'Jacobi', 'Gauss-Seidel', 'SOR', 'Laplacian')
+
+#opt-in methods that start worker processes, so they are never run by default
+PARALLEL_METHODS = ('Block-Jacobi',)
+
+#factorizations shared by every solve and diagnostic on the same matrix
+default_cache = FactorCache()
+
+
+def compute_solutions(A, b, methods=METHODS, verbose=True, cache=default_cache, monitor_options=None,
+                      precision='double', skip_divergent=False):
+    #compute solutions with multiple numerical methods; monitor_options are passed
+    #to the ConvergenceMonitor of each iterative method, and precision='mixed' lets
+    #the direct methods factor in float32 and refine to float64 accuracy
+    solutions = {}
+    monitor_options = monitor_options or {}
+    key = matrix_key(A) if cache is not None else None
+
+    #SVD solution
+    if 'SVD' in methods:
+        t0 = time.time()
+        svd_solution, kernel = min_norm_solve(A, b, cache, key, precision)
+        solutions['SVD'] = {
+            'solution': svd_solution,
+            'kernel': kernel,
+            'time': time.time() - t0
+        }
+
+    #Gauss Elimination solution, through the cheapest kernel for the structure of A
+    if 'Gauss' in methods:
+        t0 = time.time()
+        gauss_solution, kernel = direct_solve(A, b, cache, key, precision)
+        solutions['Gauss'] = {
+            'solution': gauss_solution,
+            'kernel': kernel,
+            'time': time.time() - t0
+        }
+
+    #stationary iterations, each checked first against the spectral radius of its
+    #iteration matrix; skip_divergent drops the ones that cannot converge within
+    #MAX_ITER iterations
+    for method in ('Jacobi', 'Gauss-Seidel', 'SOR'):
+        if method not in methods:
+            continue
+        t0 = time.time()
+        if method == 'Jacobi':
+            omega = None
+        elif method == 'Gauss-Seidel':
+            omega = 1.0
+        else:
+            #SOR with automatic relaxation factor
+            rho_jacobi = jacobi_spectral_radius(A)
+            omega = optimal_omega(rho_jacobi)
+            if rho_jacobi is None and verbose:
+                print("SOR method: no Jacobi spectral radius estimate, running with omega = 1 (Gauss-Seidel)")
+        rho, converged = iteration_spectral_radius(A, omega)
+        #an unconverged estimate predicts nothing and never skips a method
+        predicted = predicted_iterations(rho) if converged else None
+        if not converged:
+            if verbose:
+                print(f"{method} method: spectral radius pre-check did not converge, no iteration prediction")
+        elif predicted is None or predicted > MAX_ITER:
+            if verbose:
+                if predicted is None:
+                    print(f"{method} method cannot converge: spectral radius {rho:.4f} >= 1")
+                else:
+                    print(f"{method} method needs about {predicted} iterations (spectral radius "
+                          f"{rho:.4f}), more than the {MAX_ITER} allowed")
+            if skip_divergent:
+                continue
+
+        monitor = ConvergenceMonitor(**monitor_options)
+        if method == 'Jacobi':
+            x, history = jacobi_method(A, b, verbose=verbose, monitor=monitor)
+        else:
+            x, history = sor_method(A, b, omega=omega, verbose=verbose, name=method, monitor=monitor)
+        solutions[method] = {
+            'solution': x,
+            'history': history,
+            'history_iterations': monitor.history_iterations,
+            'iterations': monitor.iterations,
+            'status': monitor.status,
+            'spectral_radius': rho,
+            'spectral_radius_converged': converged,
+            'predicted_iterations': predicted,
+            'projected_iterations': monitor.projected_iterations,
+            'time': time.time() - t0
+        }
+        if method == 'SOR':
+            solutions[method]['omega'] = omega
+            solutions[method]['kernel'] = SOR_FALLBACK if rho_jacobi is None else f"SOR (ω={omega:.4f})"
+
+    #graph-Laplacian PCG with algebraic multigrid, only for Laplacian matrices
+    if 'Laplacian' in methods and laplacian_solver.is_laplacian(A):
+        t0 = time.time()
+        result = laplacian_solver.laplacian_solve(A, b, project=True)
+        solutions['Laplacian'] = {
+            'solution': result['solution'],
+            'history': result['history'],
+            'iterations': len(result['history']),
+            'imbalance': result['imbalance'],
+            'time': time.time() - t0
+        }
+
+    #block Jacobi over subdomains owned by worker processes
+    if 'Block-Jacobi' in methods:
+        #imported here because domain_decomposition builds on this module
+        import domain_decomposition
+        t0 = time.time()
+        monitor = ConvergenceMonitor(**monitor_options)
+        bj_solution, bj_history = domain_decomposition.block_jacobi_solve(A, b, verbose=verbose, monitor=monitor)
+        solutions['Block-Jacobi'] = {
+            'solution': bj_solution,
+            'history': bj_history,
+            'history_iterations': monitor.history_iterations,
+            'iterations': monitor.iterations,
+            'time': time.time() - t0
+        }
+
+    #calculate residuals
+    for method in solutions:
+        solutions[method]['residual'] = np.linalg.norm(A @ solutions[method]['solution'] - b)
+
+    return solutions
+
+
+def applicable_methods(A, methods=METHODS):
+    #drop methods that do not apply to A (Laplacian PCG needs a graph Laplacian)
+    return tuple(m for m in methods if m != 'Laplacian' or laplacian_solver.is_laplacian(A))
+
+
+def solve_method(A, b, method, verbose=False, monitor_options=None, precision='double'):
+    #solve with a single method; module level so it can run as a process pool task
+    return compute_solutions(A, b, methods=(method,), verbose=verbose,
+                             monitor_options=monitor_options, precision=precision).get(method)
+
+
+def iter_solutions(A, b, methods=METHODS, max_workers=None, processes=False, monitor_options=None,
+                   precision='double'):
+    #run the methods concurrently and yield (method, data) as each one finishes;
+    #a method that raised yields {'error': message} instead
+    if processes:
+        #spawned workers only import this module, never the GUI
+        executor = ProcessPoolExecutor(max_workers, mp_context=multiprocessing.get_context('spawn'))
+    else:
+        executor = ThreadPoolExecutor(max_workers)
+
+    with executor:
+        futures = {executor.submit(solve_method, A, b, method, False, monitor_options, precision): method
+                   for method in methods}
+        try:
+            for future in as_completed(futures):
+                try:
+                    data = future.result()
+                except Exception as e:
+                    data = {'error': str(e)}
+                yield futures[future], data
+        finally:
+            #a consumer that stops early (a closed window) skips the methods not yet started
+            for future in futures:
+                future.cancel()
+
+
+def solve_many(A, B, methods=('SVD', 'Gauss'), cache=default_cache, precision='double'):
+    #solve A X = B for a whole (n, k) block of right-hand sides, factoring A once per method
+    B = np.asarray(B, dtype=np.float64)
+    solutions = {}
+    key = matrix_key(A) if cache is not None else None
+
+    if 'SVD' in methods:
+        t0 = time.time()
+        X, kernel = min_norm_solve(A, B, cache, key, precision)
+        solutions['SVD'] = {'solution': X, 'kernel': kernel, 'time': time.time() - t0}
+
+    if 'Gauss' in methods:
+        t0 = time.time()
+        X, kernel = direct_solve(A, B, cache, key, precision)
+        solutions['Gauss'] = {'solution': X, 'kernel': kernel, 'time': time.time() - t0}
+
+    #one residual per right-hand side
+    for method in solutions:
+        solutions[method]['residual'] = np.linalg.norm(A @ solutions[method]['solution'] - B, axis=0)
+
+    return solutions
+
+
+#LSQR iterations per unknown in the sparse minimum-norm fallback; SciPy's default of
+#2 per unknown stops early on long chains and leaves residuals of order 1
+LSQR_ITER_FACTOR = 10
+
+
+def sparse_min_norm_solve(A, b, factor=None):
+    #minimum-norm solution of a sparse system from its LU factors: the unique solution
+    #when A is nonsingular, and the grounded solution minus its nullspace component
+    #when the last node had to be grounded (one-dimensional nullspace)
+    if factor is None:
+        factor = sparse_lu_factor(A)
+    lu, grounded = factor
+    x = sparse_lu_factor_solve(factor, b)
+    if grounded:
+        A = sp.csc_matrix(A)
+        z = np.ones(A.shape[0])
+        z[:-1] = lu.solve(-A[:-1, -1].toarray().ravel())
+        x -= np.multiply.outer(z, z @ x / (z @ z))
+
+    #inconsistent b or a larger nullspace: fall back to LSQR, which from x0 = 0
+    #converges to the same minimum-norm (pseudo-inverse) solution
+    residual = np.linalg.norm(A @ x - b, axis=0)
+    scale = np.maximum(np.linalg.norm(b, axis=0), 1.0)
+    bad = np.atleast_1d(residual > 1e-8 * scale)
+    if bad.any():
+        x = x.reshape(len(x), -1)
+        b_cols = b.reshape(len(b), -1)
+        for j in np.flatnonzero(bad):
+            x[:, j] = spla.lsqr(A, b_cols[:, j], atol=1e-14, btol=1e-14, iter_lim=LSQR_ITER_FACTOR * A.shape[0])[0]
+        x = x.reshape(b.shape)
+    return x
+
+
+def cached_factor(A, kind, cache=default_cache, key=None):
+    #'svd', 'lu' (Gauss / SuperLU), 'lapack_lu', 'structured' or 'single' (float32 LU)
+    #factor of A, shared through the cache when given
+    factorize = {'svd': svd_factor, 'lu': gauss_factor, 'lapack_lu': linalg.lu_factor,
+                 'structured': structured_factor, 'single': mixed_precision.single_factor}[kind]
+    if cache is None:
+        return factorize(A)
+    return cache.get(A, kind, factorize, key)
+
+
+def structured_factor(A):
+    #specialized factor for the structure of A (see matrix_structure), or just the
+    #kernel name when the general elimination has to do
+    structure = matrix_structure.analyze_structure(A)
+    factor = matrix_structure.structured_factor(A, structure)
+    if factor is not None:
+        return factor
+    kernel = 'sparse LU (SuperLU)' if sp.issparse(A) else 'Gauss elimination'
+    return kernel, None, False, structure
+
+
+def direct_factor(A, cache=default_cache, key=None):
+    #(kernel, factor, grounded, structure) of the cheapest correct direct solver;
+    #the general case shares the 'lu' factor with the matrix diagnostics
+    kernel, factor, grounded, structure = cached_factor(A, 'structured', cache, key)
+    if factor is None:
+        factor = cached_factor(A, 'lu', cache, key)
+    return kernel, factor, grounded, structure
+
+
+def direct_factor_solve(factor, b):
+    #solve with a direct_factor for a vector or an (n, k) block
+    if factor[0] in ('sparse LU (SuperLU)', 'Gauss elimination'):
+        return gauss_factor_solve(factor[1], b)
+    return matrix_structure.structured_factor_solve(factor, b)
+
+
+def direct_solve(A, b, cache=default_cache, key=None, precision='double'):
+    #(solution, kernel) for the Gauss method
+    factor = cached_factor(A, 'structured', cache, key)
+    fallback = ''
+    if precision == 'mixed' and factor[1] is None:
+        x, kernel = mixed_solve(A, b, mixed_precision.refined_solve, cache, key)
+        if x is not None:
+            return x, kernel
+        fallback = f" (float64 fallback: {kernel})"
+    factor = direct_factor(A, cache, key)
+    return direct_factor_solve(factor, b), factor[0] + fallback
+
+
+def min_norm_solve(A, b, cache=default_cache, key=None, precision='double'):
+    #(minimum-norm solution, kernel) for the SVD method: from the structured factor
+    #when A (or its grounded block) is SPD, else through the full SVD or sparse LU
+    factor = cached_factor(A, 'structured', cache, key)
+    if factor[1] is not None and factor[3]['positive_definite']:
+        return matrix_structure.structured_min_norm_solve(factor, b), factor[0]
+    fallback = ''
+    if precision == 'mixed':
+        x, kernel = mixed_solve(A, b, mixed_precision.refined_min_norm_solve, cache, key)
+        if x is not None:
+            return x, kernel
+        fallback = f" (float64 fallback: {kernel})"
+    if sp.issparse(A):
+        return (sparse_min_norm_solve(A, b, cached_factor(A, 'lu', cache, key)),
+                'sparse LU + nullspace projection' + fallback)
+    return svd_factor_solve(cached_factor(A, 'svd', cache, key), b), 'SVD' + fallback
+
+
+def mixed_solve(A, b, solve, cache=default_cache, key=None):
+    #(solution, kernel) from the float32 factor and iterative refinement, or
+    #(None, reason) when A is too ill-conditioned for float32
+    factor = cached_factor(A, 'single', cache, key)
+    if factor is None:
+        return None, "float32 factor is singular"
+    x, steps = solve(factor, b)
+    if x is None:
+        return None, f"refinement stalled after {steps} steps"
+    lu = 'sparse LU' if sp.issparse(A) else 'LU'
+    return x, f"{lu} float32 + {steps} refinement steps"
+
+
+def svd_factor(A):
+    #full SVD of a dense matrix
+    return linalg.svd(A)
+
+
+def svd_factor_solve(factor, b, tol=1e-10):
+    #apply the pseudo-inverse to a vector or an (n, k) block
+    U, s, Vh = factor
+    s_inv = np.array([1/x if x > tol else 0 for x in s])
+    if b.ndim == 2:
+        s_inv = s_inv[:, None]
+    return Vh.T @ (s_inv * (U.T @ b))
+
+
+def gauss_elimination(A, b):
+    #solve system with Gauss elimination / partial pivoting
+    return gauss_factor_solve(gauss_factor(A), b)
+
+
+def gauss_factor(A):
+    #Gauss elimination with partial pivoting, keeping the pivots and multipliers
+    #so any number of right-hand sides can be eliminated later
+    if sp.issparse(A):
+        return sparse_lu_factor(A)
+
+    n = len(A)
+    U = np.array(A, dtype=np.float64)
+    pivots = np.zeros(n, dtype=int)
+    multipliers = np.zeros((n, n))
+
+    for i in range(n):
+        pivot = abs(U[i:, i]).argmax() + i
+        pivots[i] = pivot
+        if pivot != i:
+            U[[i, pivot]] = U[[pivot, i]]
+
+        if U[i,i] != 0:
+            factors = U[i+1:, i] / U[i,i]
+            multipliers[i+1:, i] = factors
+            U[i+1:, i:] -= np.outer(factors, U[i, i:])
+
+    return pivots, multipliers, U
+
+
+def gauss_factor_solve(factor, b):
+    #forward elimination and back substitution for a vector or an (n, k) block
+    if isinstance(factor[0], spla.SuperLU):
+        return sparse_lu_factor_solve(factor, b)
+
+    pivots, multipliers, U = factor
+    n = len(U)
+    y = np.array(b, dtype=np.float64)
+    for i in range(n):
+        if pivots[i] != i:
+            y[[i, pivots[i]]] = y[[pivots[i], i]]
+        y[i+1:] -= np.multiply.outer(multipliers[i+1:, i], y[i])
+
+    x = np.zeros_like(y)
+    for i in range(n-1, -1, -1):
+        if abs(U[i,i]) < 1e-10:
+            continue
+        x[i] = (y[i] - U[i,i+1:n] @ x[i+1:]) / U[i,i]
+
+    return x
+
+
+def sparse_lu_factor(A):
+    #SuperLU factorization, plus whether the last node had to be grounded
+    A = sp.csc_matrix(A)
+    try:
+        lu = spla.splu(A)
+        #rounding can leave a tiny instead of an exactly zero pivot on a singular matrix
+        if matrix_structure.nonsingular(lu.U.diagonal()):
+            return lu, False
+    except RuntimeError:
+        pass
+    #singular conservation matrix: fix the last flow to zero, like the
+    #skipped zero pivot in the dense elimination
+    return spla.splu(A[:-1, :-1]), True
+
+
+def sparse_lu_factor_solve(factor, b):
+    #solve with SuperLU factors for a vector or an (n, k) block
+    lu, grounded = factor
+    if not grounded:
+        return lu.solve(b)
+    x = np.zeros(b.shape)
+    x[:-1] = lu.solve(b[:-1])
+    return x
+
+
+#above this size dense diagnostics come from one LU factorization instead of the SVD
+EXACT_PROPERTIES_LIMIT = 2000
+
+
+def matrix_properties(A, cache=default_cache, exact_limit=EXACT_PROPERTIES_LIMIT):
+    #condition number, determinant and rank, computed once per matrix and cached
+    key = matrix_key(A) if cache is not None else None
+    compute = lambda A: compute_matrix_properties(A, cache, key, exact_limit)
+    if cache is None:
+        return compute(A)
+    return cache.get(A, 'properties', compute, key)
+
+
+def compute_matrix_properties(A, cache=default_cache, key=None, exact_limit=EXACT_PROPERTIES_LIMIT):
+    #condition number, determinant and rank from a single factorization: the SVD
+    #(exact 2-norm values) or an SPD / LU factor the solvers already cached
+    #(1-norm estimates), else one SVD for small dense matrices and one LU for
+    #large or sparse ones
+    n = A.shape[0]
+    peek = lambda kind: cache.peek(key, kind) if cache is not None else None
+    small = not sp.issparse(A) and n <= exact_limit
+    if small and peek('svd') is not None:
+        return svd_properties(A, peek('svd'))
+
+    structured = peek('structured')
+    if structured is not None and structured[1] is not None:
+        if structured[2]:
+            #connected Laplacian, grounded at its last node: singular with rank n - 1
+            return properties_dict(np.inf, 0.0, -np.inf, n - 1, estimated=True)
+        pivots = matrix_structure.spd_pivots(structured)
+        if pivots is not None:
+            solve = lambda x: matrix_structure.structured_factor_solve(structured, x)
+            return lu_properties(A, solve, solve, pivots, 1.0)
+    lu = peek('lu')
+    if lu is None and small:
+        return svd_properties(A, cached_factor(A, 'svd', cache, key))
+
+    if sp.issparse(A):
+        lu, grounded = lu if lu is not None else cached_factor(A, 'lu', cache, key)
+        if grounded:
+            #the last node had to be grounded, so A is singular with rank n - 1
+            return properties_dict(np.inf, 0.0, -np.inf, n - 1, estimated=True)
+        return lu_properties(A, lu.solve, lambda x: lu.solve(x, trans='T'), lu.U.diagonal(),
+                             permutation_sign(lu.perm_r) * permutation_sign(lu.perm_c))
+    if lu is not None:
+        #the Gauss factor leaves earlier multipliers unswapped; LAPACK's L has every
+        #later row swap applied to them
+        pivots, multipliers, U = lu
+        L = multipliers.copy()
+        for i in range(n):
+            if pivots[i] != i:
+                L[[i, pivots[i]], :i] = L[[pivots[i], i], :i]
+        lu, piv = np.triu(U) + np.tril(L, -1), pivots
+    else:
+        lu, piv = cached_factor(A, 'lapack_lu', cache, key)
+    rcond = linalg.lapack.dgecon(lu, np.abs(A).sum(axis=0).max(), norm='1')[0]
+    return estimated_properties(1 / rcond if rcond > 0 else np.inf, np.diag(lu), swap_sign(piv))
+
+
+def svd_properties(A, factor):
+    #exact 2-norm condition number, rank and determinant from the SVD; a rank-deficient
+    #matrix has determinant 0, otherwise its sign is that of the orthogonal factors,
+    #det(U) det(Vh) = +-1
+    U, s, Vh = factor
+    with np.errstate(divide='ignore'):
+        cond = s[0] / s[-1]
+    rank = int(np.sum(s > s.max() * max(A.shape) * np.finfo(s.dtype).eps))
+    if rank < len(s):
+        return properties_dict(cond, 0.0, -np.inf, rank, estimated=False)
+    sign = np.linalg.slogdet(U)[0] * np.linalg.slogdet(Vh)[0]
+    logdet = np.sum(np.log(s))
+    return properties_dict(cond, sign, logdet, rank, estimated=False)
+
+
+def lu_properties(A, solve, solve_transposed, diag, sign):
+    #1-norm condition estimate from the solves with a factor, and the determinant from
+    #the diagonal of its triangular (or D) factor
+    n = A.shape[0]
+    inverse = spla.LinearOperator((n, n), matvec=solve, rmatvec=solve_transposed, dtype=np.float64)
+    cond = abs(A).sum(axis=0).max() * spla.onenormest(inverse)
+    return estimated_properties(cond, diag, sign)
+
+
+def estimated_properties(cond, diag, sign):
+    #numerical rank from the size of the pivots (an estimate, unlike the SVD rank)
+    n = len(diag)
+    sign, logdet = diagonal_logdet(diag, sign)
+    scale = np.abs(diag).max() if n else 0.0
+    rank = int(np.sum(np.abs(diag) > scale * n * np.finfo(np.float64).eps))
+    return properties_dict(cond, sign, logdet, rank, estimated=True)
+
+
+def properties_dict(cond, sign, logdet, rank, estimated):
+    with np.errstate(over='ignore'):
+        det = sign * np.exp(logdet)
+    #exact values use the 2-norm condition number, estimates the 1-norm one
+    return {'cond': cond, 'cond_norm': '1' if estimated else '2', 'det': det, 'sign': sign,
+            'logdet': logdet, 'rank': rank, 'estimated': estimated}
+
+
+def diagonal_logdet(diag, sign):
+    #sign and log|det| of a triangular factor's diagonal times a permutation sign
+    if np.any(diag == 0):
+        return 0.0, -np.inf
+    return sign * np.prod(np.sign(diag)), np.sum(np.log(np.abs(diag)))
+
+
+def swap_sign(pivots):
+    #sign of the permutation made by a sequence of row swaps i <-> pivots[i]
+    return -1.0 if np.sum(pivots != np.arange(len(pivots))) % 2 else 1.0
+
+
+def permutation_sign(perm):
+    #sign of a permutation array: (-1)^(n - number of cycles)
+    n = len(perm)
+    graph = sp.csr_matrix((np.ones(n), (np.arange(n), perm)), shape=(n, n))
+    cycles = csgraph.connected_components(graph, directed=True, connection='weak')[0]
+    return -1.0 if (n - cycles) % 2 else 1.0
+
+
+#iteration budget and stopping tolerance of the stationary iterative methods
+MAX_ITER = 1000
+TOL = 1e-10
+
+#sweeps of the method (one matvec each) the spectral-radius pre-check of the
+#iterative methods may spend, its Krylov subspace size and its relative accuracy;
+#a pre-check that does not converge within them makes no iteration prediction
+PRECHECK_SWEEPS = 500
+PRECHECK_NCV = 30
+PRECHECK_TOL = 1e-6
+
+#up to this size the pre-check takes every eigenvalue of the dense iteration matrix
+PRECHECK_DENSE_LIMIT = 500
+
+#an iterative solve has stagnated once its error drops by less than this
+#fraction over STAGNATION_WINDOW iterations (it would need millions more)
+STAGNATION_WINDOW = 50
+STAGNATION_TOL = 1e-3
+
+#an iterative solve has diverged once its error grows this far above its best
+DIVERGENCE_FACTOR = 1e6
+
+#relative accuracy and restart budget of the ARPACK estimates behind the SOR
+#relaxation factor
+EIGS_TOL = 1e-6
+EIGS_MAXITER = 300
+
+#residual at which the smallest eigenvalue of a normalized Laplacian has converged,
+#and the iteration budget of the AMG-preconditioned LOBPCG run that finds it
+LOBPCG_TOL = 1e-4
+LOBPCG_MAXITER = 100
+
+#kernel name of SOR when no spectral radius estimate came back
+SOR_FALLBACK = "SOR (ω=1 fallback)"
+
+
+class ConvergenceMonitor:
+    #stopping test and preallocated convergence history for the iterative solvers
+    #criterion: 'update' (relative change of x) or 'residual' (||b - A x|| / ||b||)
+    #stride: record every stride-th iteration; record=False keeps no history at all
+    #callback(iteration, x, error) is called after every check and may return True to stop
+    #stagnation_window / divergence_factor stop hopeless solves early (0 / inf to disable)
+    def __init__(self, criterion='update', stride=1, record=True, callback=None,
+                 stagnation_window=STAGNATION_WINDOW, divergence_factor=DIVERGENCE_FACTOR):
+        if criterion not in ('update', 'residual'):
+            raise ValueError(f"unknown stopping criterion: {criterion}")
+        self.criterion = criterion
+        self.stride = max(int(stride), 1)
+        self.record = record
+        self.callback = callback
+        self.stagnation_window = int(stagnation_window)
+        self.divergence_factor = divergence_factor
+        self.start(0, 0.0, np.zeros(0))
+
+    def start(self, max_iter, tol, b):
+        self.tol = tol
+        self.b_norm = np.linalg.norm(b) or 1.0
+        self.errors = np.empty(max_iter // self.stride if self.record else 0)
+        self.count = 0
+        self.iterations = 0
+        self.converged = False
+        #'converged', 'stagnated', 'diverged', 'stopped' (callback) or 'max_iter'
+        self.status = 'max_iter'
+        #best error so far, at the last window boundary, and its rate over the window
+        self.best = np.inf
+        self.checkpoint = np.inf
+        self.rate = None
+
+    def check(self, i, x, x_old, r_old):
+        #stopping test after iteration i; r_old is the residual b - A x_old, which
+        #both solvers get for free from their sweep
+        if self.criterion == 'update':
+            error = np.linalg.norm(x - x_old) / np.linalg.norm(x)
+        else:
+            error = np.linalg.norm(r_old) / self.b_norm
+        return self.check_error(i, x, error)
+
+    def check_error(self, i, x, error):
+        #stopping test for an error the solver computed itself (e.g. from partial norms)
+        self.iterations = i + 1
+
+        if self.count < len(self.errors) and self.iterations % self.stride == 0:
+            self.errors[self.count] = error
+            self.count += 1
+        self.converged = error < self.tol
+        if self.converged:
+            self.status = 'converged'
+        elif not np.isfinite(error) or error > self.divergence_factor * self.best:
+            self.status = 'diverged'
+        self.best = min(self.best, error)
+        if not self.converged and self.status == 'max_iter' and self.stagnation_window \
+                and self.iterations % self.stagnation_window == 0:
+            #the best error of each window must beat the one before (SOR is not monotone)
+            if np.isfinite(self.checkpoint):
+                self.rate = (self.best / self.checkpoint) ** (1 / self.stagnation_window)
+            if self.best > (1 - STAGNATION_TOL) * self.checkpoint:
+                self.status = 'stagnated'
+            self.checkpoint = self.best
+
+        if self.callback is not None and self.callback(self.iterations, x, error):
+            if self.status == 'max_iter':
+                self.status = 'stopped'
+            return True
+        return self.status != 'max_iter'
+
+    @property
+    def history(self):
+        return self.errors[:self.count]
+
+    @property
+    def projected_iterations(self):
+        #total iterations the solve would need at the error reduction rate of its last
+        #stagnation window; None if that rate is unknown or not converging
+        if self.converged:
+            return self.iterations
+        if self.rate is None or not 0 < self.rate < 1:
+            return None
+        return self.iterations + int(np.ceil(np.log(self.tol / self.best) / np.log(self.rate)))
+
+    @property
+    def history_iterations(self):
+        #iteration number of every recorded error
+        return self.stride * np.arange(1, self.count + 1)
+
+
+def jacobi_method(A, b, max_iter=MAX_ITER, tol=TOL, verbose=True, monitor=None, x0=None):
+    #solve with Jacobi / iterative method, starting from x0 (zeros by default)
+    n = A.shape[0]
+    x = np.zeros(n) if x0 is None else np.array(x0, dtype=np.float64)
+    if sp.issparse(A):
+        #each sweep is a single O(nnz) sparse matvec
+        D = A.diagonal()
+        R = sp.csr_matrix(A - sp.diags(D))
+    else:
+        D = np.diag(A)
+        R = A - np.diagflat(D)
+    if monitor is None:
+        monitor = ConvergenceMonitor()
+    monitor.start(max_iter, tol, b)
+
+    for i in range(max_iter):
+        x_old = x
+        x = (b - R @ x_old) / D
+        #b - A x_old = D (x - x_old), so the residual costs no extra matvec
+        if monitor.check(i, x, x_old, D * (x - x_old)):
+            break
+
+    report(verbose, "Jacobi", monitor)
+    return x, monitor.history
+
+
+def gauss_seidel_method(A, b, max_iter=MAX_ITER, tol=TOL, verbose=True, monitor=None, x0=None):
+    #solve with Gauss-Seidel / iterative method (SOR with omega = 1)
+    return sor_method(A, b, omega=1.0, max_iter=max_iter, tol=tol, verbose=verbose,
+                      name="Gauss-Seidel", monitor=monitor, x0=x0)
+
+
+def sor_method(A, b, omega=None, max_iter=MAX_ITER, tol=TOL, verbose=True, name="SOR", monitor=None,
+               x0=None):
+    #solve with successive over-relaxation / iterative method
+    #each sweep is x += M^-1 (b - A x) with M = D/omega + L, a single triangular
+    #solve on the split matrix instead of a Python loop over rows
+    if omega is None:
+        rho = jacobi_spectral_radius(A)
+        omega = optimal_omega(rho)
+        if rho is None and verbose:
+            print(f"{name} method: no Jacobi spectral radius estimate, running with omega = 1 (Gauss-Seidel)")
+
+    n = A.shape[0]
+    x = np.zeros(n) if x0 is None else np.array(x0, dtype=np.float64)
+    D = A.diagonal()
+    if sp.issparse(A):
+        M = sp.csr_matrix(sp.tril(A, k=-1) + sp.diags(D / omega))
+        solve = lambda r: spla.spsolve_triangular(M, r, lower=True)
+    else:
+        M = np.tril(A, k=-1) + np.diag(D / omega)
+        solve = lambda r: linalg.solve_triangular(M, r, lower=True, check_finite=False)
+    if monitor is None:
+        monitor = ConvergenceMonitor()
+    monitor.start(max_iter, tol, b)
+
+    for i in range(max_iter):
+        x_old = x
+        r = b - A @ x_old
+        x = x_old + solve(r)
+        if monitor.check(i, x, x_old, r):
+            break
+
+    report(verbose, name, monitor)
+    return x, monitor.history
+
+
+def report(verbose, name, monitor):
+    #print the outcome of an iterative solve
+    if not verbose:
+        return
+    if monitor.converged:
+        print(f"{name} method converged in {monitor.iterations} iterations")
+    elif monitor.status in ('stagnated', 'diverged'):
+        print(f"{name} method {monitor.status} and was stopped after {monitor.iterations} iterations")
+    else:
+        print(f"{name} method did not converge within maximum iterations")
+
+
+def jacobi_spectral_radius(A, k=3, tol=1e-10):
+    #estimate the spectral radius of the Jacobi iteration matrix J = I - D^-1 A, or
+    #None when the eigenvalue solver did not converge
+    n = A.shape[0]
+    D = np.asarray(A.diagonal(), dtype=np.float64)
+    if n <= 64:
+        dense = A.toarray() if sp.issparse(A) else A
+        mu = np.abs(np.linalg.eigvals(np.eye(n) - dense / D[:, None]))
+    elif matrix_structure.analyze_structure(A)['symmetric'] and np.all(D > 0):
+        #J is similar to I - N with N = D^-1/2 A D^-1/2; on the consistently ordered
+        #(grid-like) networks Young's formula is derived for, the spectrum of J is
+        #symmetric about 0 and rho(J) = 1 - lambda_min(N)
+        lam = normalized_min_eigenvalue(A, D)
+        return None if lam is None else max(1 - lam, 0.0)
+    else:
+        #fixed start vector so SOR gets the same relaxation factor on every run
+        J = spla.LinearOperator((n, n), matvec=lambda v: v - (A @ v) / D, dtype=np.float64)
+        try:
+            mu = np.abs(spla.eigs(J, k=min(k, n - 2), which='LM', tol=EIGS_TOL, ncv=min(n, 20),
+                                  maxiter=EIGS_MAXITER, v0=np.random.default_rng(0).standard_normal(n),
+                                  return_eigenvectors=False))
+        except spla.ArpackNoConvergence as e:
+            mu = np.abs(e.eigenvalues)
+        if mu.size == 0:
+            return None
+        #Ritz values are only accurate to EIGS_TOL
+        tol = max(tol, EIGS_TOL)
+
+    if mu.max() > 1 + tol:
+        return mu.max()
+    #unit-modulus modes belong to the nullspace of a singular (Laplacian) matrix
+    #and do not affect convergence on a consistent system
+    below = mu[mu < 1 - tol]
+    return below.max() if below.size else 1.0
+
+
+def normalized_min_eigenvalue(A, D):
+    #smallest eigenvalue of N = D^-1/2 A D^-1/2 for symmetric A with a positive
+    #diagonal, or None if it did not converge. The constant null vector of each
+    #connected Laplacian component, D^1/2 1_c in N, is projected out, so a Laplacian
+    #gives its smallest nonzero eigenvalue: LOBPCG with the AMG V-cycle as
+    #preconditioner, which converges in a few dozen iterations at any size. Other
+    #matrices use Lanczos for the largest eigenvalue of I - N
+    n = A.shape[0]
+    s = np.sqrt(D)
+    v0 = np.random.default_rng(0).standard_normal(n)
+    N = lambda v: (A @ (v / s)) / s
+    if not laplacian_solver.is_laplacian(A):
+        S = spla.LinearOperator((n, n), matvec=lambda v: v - N(v), dtype=np.float64)
+        try:
+            return 1 - spla.eigsh(S, k=1, which='LA', tol=EIGS_TOL, ncv=min(n, 40), maxiter=EIGS_MAXITER,
+                                  v0=v0, return_eigenvectors=False)[0]
+        except spla.ArpackNoConvergence:
+            return None
+
+    labels = laplacian_solver.components(A)
+    weight = np.bincount(labels, weights=D)
+    project = lambda v: v - s * (np.bincount(labels, weights=s * v) / weight)[labels]
+    #N^-1 ~ D^1/2 A^+ D^1/2 on the range, applied through one V-cycle
+    amg = laplacian_solver.AMGPreconditioner(A)
+    operator = spla.LinearOperator((n, n), matvec=lambda v: project(N(project(v.ravel()))),
+                                   dtype=np.float64)
+    preconditioner = spla.LinearOperator((n, n), matvec=lambda v: project(s * amg.apply(s * project(v.ravel()))),
+                                         dtype=np.float64)
+    X = np.column_stack([project(v0), project(np.random.default_rng(1).standard_normal(n))])
+    with warnings.catch_warnings():
+        #convergence is checked below, from the Ritz residual
+        warnings.simplefilter('ignore', UserWarning)
+        lam, vectors = spla.lobpcg(operator, X, M=preconditioner, tol=LOBPCG_TOL, maxiter=LOBPCG_MAXITER,
+                                   largest=False)
+    k = int(np.argmin(lam))
+    v = vectors[:, k] / np.linalg.norm(vectors[:, k])
+    if np.linalg.norm(operator @ v - lam[k] * v) > LOBPCG_TOL:
+        return None
+    return float(lam[k])
+
+
+def iteration_spectral_radius(A, omega=None, sweeps=None, tol=1e-8):
+    #(rho, converged): spectral radius of the Jacobi (omega=None) or SOR (Gauss-Seidel:
+    #omega=1) iteration matrix T = I - M^-1 A. Eigenvalue 1 belongs to the nullspace of
+    #a singular network and is deflated, since it does not grow on consistent demands;
+    #unlike jacobi_spectral_radius, -1 is kept, because that mode oscillates forever.
+    #Large matrices get an eigenvalue solver of at most `sweeps` sweeps of the method;
+    #if it does not converge, rho is the best Ritz value found (None without one) and
+    #only a hint, and converged is False
+    n = A.shape[0]
+    D = A.diagonal()
+    if omega is None:
+        precondition = lambda r: r / (D if r.ndim == 1 else D[:, None])
+    elif sp.issparse(A):
+        M = sp.csr_matrix(sp.tril(A, k=-1) + sp.diags(D / omega))
+        precondition = lambda r: spla.spsolve_triangular(M, r, lower=True)
+    else:
+        M = np.tril(A, k=-1) + np.diag(D / omega)
+        precondition = lambda r: linalg.solve_triangular(M, r, lower=True, check_finite=False)
+
+    if n <= PRECHECK_DENSE_LIMIT:
+        dense = A.toarray() if sp.issparse(A) else np.asarray(A, dtype=np.float64)
+        mu = np.linalg.eigvals(np.eye(n) - precondition(dense))
+        mu = mu[np.abs(mu - 1) > tol]
+        return (float(np.abs(mu).max()) if mu.size else 0.0), True
+
+    sweeps = sweeps or PRECHECK_SWEEPS
+    options = {'tol': PRECHECK_TOL, 'ncv': min(n - 1, PRECHECK_NCV), 'maxiter': max(sweeps // PRECHECK_NCV, 1),
+               'v0': np.random.default_rng(0).standard_normal(n), 'return_eigenvectors': False}
+    laplacian = laplacian_solver.is_laplacian(A)
+    if omega is None and np.all(D > 0) and matrix_structure.analyze_structure(A)['symmetric']:
+        return jacobi_iteration_radius(A, D, laplacian, options)
+
+    T = lambda v: v - precondition(A @ v)
+    if laplacian:
+        #Wielandt deflation of eigenvalue 1: its right eigenvectors are the component
+        #indicators 1_c and its left ones M^T 1_c, so T - sum_c 1_c z_c^T with
+        #z_c = M^T 1_c / (1_c^T M^T 1_c) keeps every other eigenvalue and maps 1 to 0
+        labels = laplacian_solver.components(A)
+        z = np.asarray((M if omega is not None else sp.diags(D)).sum(axis=0)).ravel()
+        z = z / np.bincount(labels, weights=z)[labels]
+        deflated = T
+        T = lambda v: deflated(v) - np.bincount(labels, weights=z * v)[labels]
+    try:
+        mu = np.abs(spla.eigs(spla.LinearOperator((n, n), matvec=T, dtype=np.float64), k=2, which='LM',
+                              **options))
+        converged = True
+    except spla.ArpackNoConvergence as e:
+        mu = np.abs(e.eigenvalues)
+        converged = False
+    if not mu.size:
+        return None, False
+    rho = float(mu.max())
+    #Ritz values are only accurate to PRECHECK_TOL; an exact -1 (or any unit-modulus
+    #mode) comes back slightly below 1
+    return (1.0 if abs(rho - 1) <= PRECHECK_TOL else rho), converged
+
+
+def jacobi_iteration_radius(A, D, laplacian, options):
+    #(rho, converged) of J = I - D^-1 A for symmetric A with a positive diagonal. J is
+    #similar to I - N with N = D^-1/2 A D^-1/2, so Lanczos checks both ends of its real
+    #spectrum. On a Laplacian, -1 is an eigenvalue exactly when a component is
+    #bipartite, the top end is 1 - lambda_min(N) from normalized_min_eigenvalue, and
+    #only the bottom end, 1 - lambda_max(N), is left to Lanczos
+    n = A.shape[0]
+    s = np.sqrt(D)
+    if laplacian and laplacian_solver.has_bipartite_component(A):
+        return 1.0, True
+    S = spla.LinearOperator((n, n), matvec=lambda v: v - (A @ (v / s)) / s, dtype=np.float64)
+    top = None
+    if laplacian:
+        lam = normalized_min_eigenvalue(A, D)
+        top = None if lam is None else 1 - lam
+    try:
+        mu = spla.eigsh(S, k=1 if laplacian else 2, which='SA' if laplacian else 'BE', **options)
+        converged = top is not None if laplacian else True
+    except spla.ArpackNoConvergence as e:
+        mu = e.eigenvalues
+        converged = False
+    mu = np.abs(np.append(mu, [] if top is None else [top]))
+    if not mu.size:
+        return None, False
+    return float(mu.max()), converged
+
+
+def predicted_iterations(rho, tol=TOL):
+    #iterations for the error to shrink by tol at rate rho; None if it never will
+    if rho is None or rho >= 1:
+        return None
+    if rho == 0:
+        return 1
+    return int(np.ceil(np.log(tol) / np.log(rho)))
+
+
+def optimal_omega(rho):
+    #Young's optimal relaxation factor from the Jacobi spectral radius; Gauss-Seidel
+    #(omega = 1) when there is no estimate or rho >= 1
+    if rho is None or rho >= 1:
+        return 1.0
+    return 2 / (1 + np.sqrt(1 - rho**2))